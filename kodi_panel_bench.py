@@ -0,0 +1,262 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# Timing measurements for some of kodi_panel's more expensive
+# operations, useful for choosing settings on slower SBCs like the
+# RPi Zero.  Like kodi_panel itself, this script must be run from the
+# directory containing the setup.toml file (or KODI_PANEL_SETUP must
+# point to one), since kodi_panel_display gets imported.
+#
+# Usage:
+#
+#   python kodi_panel_bench.py artwork [--image cover.jpg] [--size 300]
+#
+#     Compares kodi_panel's original thumbnail() call against each of
+#     the ART_RESAMPLE modes.  That call already decoded JPEGs at
+#     reduced resolution, exactly as the "default" mode does, so only
+#     "fast" (and "quality", in the other direction) changes anything.
+#     Without --image, a 3000x3000 JPEG is synthesized.
+#
+#   python kodi_panel_bench.py text [--font fonts/Cabin.ttf] [--width 300]
+#
+#     Compares the original one-character-at-a-time truncation and
+#     word-at-a-time wrapping against kodi_panel_display's current
+#     truncate_line() and text_wrap(), using long classical titles.
+#
+#   python kodi_panel_bench.py glyphs [--font fonts/DSEG7Classic-Regular.ttf]
+#
+#     Compares draw.text() against the Glyph Atlas for elapsed-time
+#     and clock strings, each drawn just once as they would be.
+#
+# ----------------------------------------------------------------------------
+
+import argparse
+import io
+import os
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+# kodi_panel modules
+import kodi_panel_display
+
+
+# Time a callable, returning the average number of milliseconds per
+# call over the given number of repetitions
+def time_ms(func, repeat):
+    func()  # warm up
+    start = time.perf_counter()
+    for i in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+# Create an incompressible-ish JPEG, roughly like a scanned cover
+def synthetic_cover(size):
+    noise = Image.frombytes("RGB", (size // 8, size // 8),
+                            os.urandom(3 * (size // 8) ** 2))
+    cover = noise.resize((size, size), Image.BICUBIC)
+    data = io.BytesIO()
+    cover.save(data, "JPEG", quality=90)
+    return data.getvalue()
+
+
+def bench_artwork(args):
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_cover(3000)
+
+    original = Image.open(io.BytesIO(data))
+    print("Cover: %s %dx%d, %d KiB; target %d px; %d repetitions" %
+          (original.format, original.width, original.height,
+           len(data) // 1024, args.size, args.repeat))
+
+    # Pillow's defaults, as kodi_panel called thumbnail() originally
+    def original():
+        cover = Image.open(io.BytesIO(data))
+        cover.thumbnail((args.size, args.size))
+        return cover
+
+    baseline = time_ms(original, args.repeat)
+    print("  %-8s %8.1f ms" % ("original", baseline))
+
+    for mode in kodi_panel_display.RESAMPLE_MODES:
+        def reduced():
+            cover = Image.open(io.BytesIO(data))
+            kodi_panel_display.reduce_artwork(cover, args.size, args.size, mode)
+            return cover
+
+        elapsed = time_ms(reduced, args.repeat)
+        print("  %-8s %8.1f ms  (%.2fx the original's speed)" %
+              (mode, elapsed, baseline / elapsed))
+
+
+# Long titles and album names, the worst case for wrap and trunc fields
+CLASSICAL_TITLES = [
+    "Symphony No. 9 in D minor, Op. 125 \"Choral\": IV. Presto - Allegro assai - "
+    "Allegro assai vivace (alla marcia) - Andante maestoso - Allegro energico, "
+    "sempre ben marcato",
+    "Piano Concerto No. 2 in C minor, Op. 18: II. Adagio sostenuto - "
+    "Piu animato - Tempo I",
+    "Mass in B minor, BWV 232: Gloria: Domine Deus, Rex coelestis, "
+    "Deus Pater omnipotens",
+    "Brandenburg Concerto No. 5 in D major, BWV 1050: I. Allegro",
+    "Die Zauberfloete, K. 620, Act II: \"Der Hoelle Rache kocht in meinem Herzen\" "
+    "(Koenigin der Nacht)",
+    "Bruckner: Symphony No. 8 in C minor, WAB 108 (1890 Version, Ed. Nowak) - "
+    "Berliner Philharmoniker, Herbert von Karajan",
+    "Goldberg Variations, BWV 988 (1981 Recording): Variatio 25 a 2 Clav.",
+    "Das Lied von der Erde: VI. Der Abschied. Schwer - Etwas fliessender, "
+    "aber ohne Steigerung",
+]
+
+
+# kodi_panel's original truncate_line() and text_wrap(), for comparison
+def naive_truncate_line(line, font, max_width):
+    truncating = 0
+    new_text = line
+
+    t_width = font.getsize(line)[0]
+    if t_width <= max_width:
+        return line
+
+    avg_char = len(new_text) / t_width
+    num_chars = int(max_width / avg_char) + 4
+    new_text = new_text[0:num_chars]
+
+    avail_width = max_width - font.getsize("\u2026")[0] + 6
+
+    t_width = font.getsize(new_text)[0]
+    while (t_width > avail_width):
+        truncating = 1
+        new_text = new_text[:-1]
+        t_width = font.getsize(new_text)[0]
+
+    final_text = new_text
+    if truncating:
+        final_text += "\u2026"
+
+    return final_text
+
+
+def naive_text_wrap(text, font, max_width, max_lines=None):
+    lines = []
+
+    if font.getsize(text)[0] <= max_width:
+        lines.append(text)
+    elif max_lines and max_lines == 1:
+        lines.append(naive_truncate_line(text, font, max_width))
+    else:
+        words = text.split(' ')
+        i = 0
+        while i < len(words):
+            line = ''
+            while i < len(words) and font.getsize(
+                    line + words[i])[0] <= max_width:
+                line = line + words[i] + " "
+                i += 1
+            if not line:
+                line = words[i]
+                i += 1
+            lines.append(line)
+            if max_lines and len(lines) >= max_lines - 1:
+                break
+
+        if max_lines and len(lines) >= max_lines - 1 and i < len(words):
+            lines.append(naive_truncate_line(" ".join(words[i:]), font, max_width))
+
+    return lines
+
+
+def bench_text(args):
+    # Bypass the lru_caches, so that every call does the work.  Glyph
+    # advances and kerning are left warm, as they would be in a
+    # running kodi_panel, but not the exact widths of whole strings.
+    truncate_line = kodi_panel_display.truncate_line.__wrapped__
+    text_wrap = kodi_panel_display.text_wrap.__wrapped__
+
+    print("Font %s; width %d px; %d titles; %d repetitions" %
+          (args.font, args.width, len(CLASSICAL_TITLES), args.repeat))
+    for size in args.sizes:
+        font = ImageFont.truetype(args.font, size)
+        for name, naive, current in (
+                ("trunc", lambda t: naive_truncate_line(t, font, args.width),
+                 lambda t: truncate_line(t, font, args.width)),
+                ("wrap", lambda t: naive_text_wrap(t, font, args.width, args.lines),
+                 lambda t: text_wrap(t, font, args.width, args.lines))):
+            for title in CLASSICAL_TITLES:
+                assert naive(title) == current(title), title
+
+            baseline = time_ms(lambda: [naive(t) for t in CLASSICAL_TITLES],
+                               args.repeat)
+            metrics = kodi_panel_display.font_metrics(font)
+            elapsed = time_ms(lambda: [metrics.widths.clear()] +
+                              [current(t) for t in CLASSICAL_TITLES],
+                              args.repeat)
+            print("  %3d pt %-6s original %8.2f ms  current %8.2f ms  (%.1fx faster)" %
+                  (size, name, baseline, elapsed, baseline / elapsed))
+
+
+def bench_glyphs(args):
+    image = Image.new("RGB", (800, 480))
+    draw = ImageDraw.Draw(image)
+    elapsed_times = ["%d:%02d" % divmod(sec, 60) for sec in range(600)]
+    clock_times = ["%d:%02d %s" % (1 + hour % 12, minute, "AM" if hour < 12 else "PM")
+                   for hour in range(24) for minute in range(0, 60, 5)]
+
+    print("Font %s; %d repetitions" % (args.font, args.repeat))
+    for size in args.sizes:
+        font = ImageFont.truetype(args.font, size)
+        for name, strings in (("elapsed", elapsed_times), ("clock", clock_times)):
+            def plain():
+                for text in strings:
+                    draw.text((10, 10), text, fill="white", font=font)
+
+            def atlas():
+                for text in strings:
+                    kodi_panel_display.draw_glyphs(draw, (10, 10), text, "white", font)
+
+            baseline = time_ms(plain, args.repeat) * 1000 / len(strings)
+            elapsed = time_ms(atlas, args.repeat) * 1000 / len(strings)
+            print("  %3d pt %-8s draw.text %7.1f us  atlas %7.1f us  (%.1fx faster)" %
+                  (size, name, baseline, elapsed, baseline / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kodi_panel benchmarks")
+    subparsers = parser.add_subparsers(dest="bench", required=True)
+
+    artwork = subparsers.add_parser("artwork", help="artwork decode and resample")
+    artwork.add_argument("--image", help="cover art file to use")
+    artwork.add_argument("--size", type=int, default=300,
+                         help="thumbnail size in pixels")
+    artwork.add_argument("--repeat", type=int, default=10)
+    artwork.set_defaults(func=bench_artwork)
+
+    text = subparsers.add_parser("text", help="text truncation and wrapping")
+    text.add_argument("--font", default="fonts/Cabin.ttf")
+    text.add_argument("--sizes", type=int, nargs="+", default=[18, 24, 32])
+    text.add_argument("--width", type=int, default=300,
+                      help="max_width in pixels")
+    text.add_argument("--lines", type=int, default=3,
+                      help="max_lines for wrapping")
+    text.add_argument("--repeat", type=int, default=20)
+    text.set_defaults(func=bench_text)
+
+    glyphs = subparsers.add_parser("glyphs", help="glyph atlas for time fields")
+    glyphs.add_argument("--font", default="fonts/DSEG7Classic-Regular.ttf")
+    glyphs.add_argument("--sizes", type=int, nargs="+", default=[24, 48, 72])
+    glyphs.add_argument("--repeat", type=int, default=5)
+    glyphs.set_defaults(func=bench_glyphs)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
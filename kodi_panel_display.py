@@ -33,18 +33,28 @@ from luma.core.device import device
 from PIL import Image
 from PIL import ImageDraw
 from PIL import ImageFont
+from PIL import ImageChops
+from PIL import ImageColor
 
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, unquote
 from aenum import Enum, extend_enum
 from functools import lru_cache
 import copy
 import time
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import hashlib
+import tempfile
 import io
+import math
 import re
 import os
+import socket
+import sqlite3
+import codecs
 import threading
 import warnings
 import traceback
@@ -228,19 +238,12 @@ _last_image_time = None   # used with airtunes / airplay coverart
 # useful for any element-rendering callback functions.
 _image_default = False
 
-# Re-use static portion of a screen.  The various _last_* variables
-# below are checked to determine when the static portion can be
-# reused.
+# Re-use static portion of a screen.  The _static_key variable below,
+# identifying the layout and the item playing, is checked to determine
+# when the static portion can be reused.  Recently used static images
+# are also retained (see Static Frame Cache).
 _static_image = None
-_static_video = False  # set True by video_screens(), False by audio_screens()
-
-_last_track_num = None
-_last_track_title = None
-_last_track_album = None
-_last_track_time = None
-_last_video_title = None
-_last_video_time = None
-_last_video_episode = None
+_static_key = None
 
 # Thumbnail defaults (these now DO get resized as needed)
 _kodi_thumb = config.settings.get("KODI_THUMB", "images/kodi_thumb.jpg")
@@ -258,9 +261,13 @@ _airtunes_re = re.compile(
 #
 DEBUG_FIELDS = config.settings.get("DEBUG_FIELDS", False)
 DEBUG_ART    = config.settings.get("DEBUG_ART", False)
+DEBUG_RPC    = config.settings.get("DEBUG_RPC", False)
+DEBUG_FRAMES = config.settings.get("DEBUG_FRAMES", False)
 
 if DEBUG_FIELDS: print("DEBUG_FIELDS print statements enabled.")
 if DEBUG_ART:    print("DEBUG_ART print statements enabled.")
+if DEBUG_RPC:    print("DEBUG_RPC print statements enabled.")
+if DEBUG_FRAMES: print("DEBUG_FRAMES print statements enabled.")
 
 
 #
@@ -335,6 +342,295 @@ if ("CODECS" in config.settings.keys() and
     codec_name.update( config.settings["CODECS"] )
 
 
+# JSON-RPC Transport
+# ------------------
+#
+# All JSON-RPC calls and artwork downloads go through a single
+# requests.Session.  The session keeps its HTTP connection(s) to Kodi
+# alive between calls, so that each update_display() invocation no
+# longer pays for a fresh TCP handshake.  Over wifi on an RPi Zero,
+# that handshake was a good portion of the update loop.
+#
+# Requests that never change (asking for the active players or for a
+# fixed list of InfoLabels) get serialized to bytes just once, below.
+#
+# Every call is timed.  Running totals are kept per method in
+# _rpc_stats, with DEBUG_RPC enabling a print of each call's latency
+# and a periodic summary from main().
+#
+RPC_TIMEOUT = config.settings.get("RPC_TIMEOUT", 5)    # seconds
+ART_TIMEOUT = config.settings.get("ART_TIMEOUT", 10)   # seconds
+
+_session = requests.Session()
+_session.headers.update(headers)
+_session.mount("http://",  HTTPAdapter(pool_connections=1, pool_maxsize=4))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# method -> [call count, total seconds, max seconds]
+_rpc_stats = {}
+_rpc_stats_lock = threading.Lock()
+
+
+def _rpc_record(method, elapsed):
+    with _rpc_stats_lock:
+        entry = _rpc_stats.setdefault(method, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+    if DEBUG_RPC:
+        print("RPC", method, "took %.1f ms" % (elapsed * 1000))
+
+
+# Serialize a JSON-RPC request once, for repeated use with kodi_rpc()
+def rpc_payload(method, params=None, id=1):
+    payload = {
+        "jsonrpc": "2.0",
+        "method": method,
+        "id": id,
+    }
+    if params is not None:
+        payload["params"] = params
+    return json.dumps(payload).encode("utf-8")
+
+
+# Issue a JSON-RPC call to Kodi, returning the decoded response.
+#
+# The call travels over the TCP notification socket when one is
+# connected (see KodiEventSocket below), otherwise over HTTP.
+#
+#  payload  either a dictionary or bytes from rpc_payload()
+#  method   name used for latency statistics, required only when
+#             passing pre-serialized bytes
+#  timeout  seconds to wait for Kodi, defaulting to RPC_TIMEOUT
+#
+def kodi_rpc(payload, method=None, timeout=None):
+    if type(payload) is dict:
+        method = method or payload.get("method", "?")
+        payload = json.dumps(payload)
+    start = time.perf_counter()
+    if _event_socket and _event_socket.connected:
+        response = _event_socket.call(payload, timeout)
+    else:
+        response = _session.post(rpc_url, data=payload,
+                                 timeout=timeout or RPC_TIMEOUT).json()
+    _rpc_record(method or "?", time.perf_counter() - start)
+    return response
+
+
+# Fetch an artwork URL via the shared session, returning the response
+def kodi_get(url, timeout=None, headers=None):
+    start = time.perf_counter()
+    r = _session.get(url, timeout=timeout or ART_TIMEOUT, headers=headers)
+    _rpc_record("HTTP GET", time.perf_counter() - start)
+    return r
+
+
+# Print accumulated per-method latency
+def rpc_stats_summary():
+    with _rpc_stats_lock:
+        for method, (count, total, worst) in sorted(_rpc_stats.items()):
+            print("  %-24s %6d calls, avg %6.1f ms, max %6.1f ms" %
+                  (method, count, 1000 * total / count, 1000 * worst))
+
+
+# Fixed requests made by update_display() and main().  The InfoLabel
+# requests are assembled (and remembered) by label_payload() and
+# batch_payload() further below.
+_PAYLOAD_PING           = rpc_payload("JSONRPC.Ping", id=2)
+_PAYLOAD_ACTIVE_PLAYERS = rpc_payload("Player.GetActivePlayers", id=3)
+
+
+# Kodi TCP Notifications
+# ----------------------
+#
+# Kodi also offers JSON-RPC over a raw TCP socket (port 9090 by
+# default, enabled via the "Allow remote control from applications"
+# settings).  Unlike HTTP, that socket delivers notifications such as
+# Player.OnPlay and Player.OnStop as they happen.
+#
+# With USE_TCP_EVENTS set, main() keeps one such connection open.
+# Requests from kodi_rpc() then travel over that same socket, and the
+# update loop sleeps until a notification (or a screen press) arrives
+# instead of asking Kodi once a second whether anything is playing.
+# Artwork is still retrieved over HTTP.
+#
+# Should the connection be lost while Kodi still answers over HTTP
+# (say, the remote control setting got toggled), kodi_rpc() falls back
+# to HTTP and main() tries to reopen it, waiting twice as long after
+# each failed attempt, up to TCP_RETRY_MAX seconds.
+#
+# Messages on the socket are not delimited, so the reader thread just
+# decodes consecutive JSON values from the byte stream.  Anything with
+# an "id" is the response to the (single) outstanding request.
+#
+USE_TCP_EVENTS   = config.settings.get("USE_TCP_EVENTS", False)
+TCP_PORT         = config.settings.get("KODI_TCP_PORT", 9090)
+TCP_IDLE_TIMEOUT = config.settings.get("TCP_IDLE_TIMEOUT", 30)  # seconds
+TCP_RETRY_MAX    = config.settings.get("TCP_RETRY_MAX", 300)     # seconds
+
+_tcp_host = urlsplit(base_url).hostname
+
+# Notifications that warrant an immediate display update
+TCP_WAKE_EVENTS = {
+    "Player.OnPlay",
+    "Player.OnAVStart",
+    "Player.OnAVChange",
+    "Player.OnPause",
+    "Player.OnResume",
+    "Player.OnStop",
+    "Player.OnSeek",
+    "Player.OnSpeedChanged",
+}
+
+# Set by notifications, screen presses, or a lost connection, to wake
+# up the main() loop early
+_wake_event = threading.Event()
+
+
+class KodiEventSocket:
+    def __init__(self, host, port, timeout=RPC_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connected = False
+        self.last_event = None    # method name of latest notification
+        self._sock = None
+        self._call_lock = threading.Lock()
+        self._response = None
+        self._response_ready = threading.Event()
+
+    def connect(self):
+        self._sock = socket.create_connection((self.host, self.port),
+                                              timeout=self.timeout)
+        self._sock.settimeout(None)
+        self.connected = True
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def close(self):
+        self.connected = False
+        if self._sock:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+        self._response_ready.set()
+
+    # Send a request (dictionary, string, or bytes) and wait for its
+    # response.  Only one request is outstanding at any time.
+    def call(self, payload, timeout=None):
+        if type(payload) is dict:
+            payload = json.dumps(payload)
+        if type(payload) is str:
+            payload = payload.encode("utf-8")
+
+        with self._call_lock:
+            if not self.connected:
+                raise ConnectionError("Kodi TCP connection is closed")
+            self._response_ready.clear()
+            self._sock.sendall(payload)
+            if not self._response_ready.wait(timeout or self.timeout):
+                # A late response could be mistaken for the next one,
+                # so give up on this connection entirely.
+                self.close()
+                raise TimeoutError("No response from Kodi TCP connection")
+            if not self.connected:
+                raise ConnectionError("Kodi TCP connection was lost")
+            return self._response
+
+    def _reader(self):
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        try:
+            while True:
+                data = self._sock.recv(65536)
+                if not data:
+                    break
+                buffer += utf8.decode(data)
+                while buffer:
+                    buffer = buffer.lstrip()
+                    try:
+                        msg, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break   # incomplete, wait for more data
+                    buffer = buffer[end:]
+                    self._dispatch(msg)
+        except OSError:
+            pass
+
+        if DEBUG_RPC and self.connected:
+            print(datetime.now(), "Kodi TCP connection closed")
+        self.connected = False
+        self._response_ready.set()
+        _wake_event.set()
+
+    def _dispatch(self, msg):
+        if type(msg) is dict and "id" not in msg and "method" in msg:
+            self.last_event = msg["method"]
+            if DEBUG_RPC:
+                print(datetime.now(), "Kodi notification", msg["method"])
+            if msg["method"] in TCP_WAKE_EVENTS:
+                _clock.stale = True
+                _wake_event.set()
+        else:
+            self._response = msg
+            self._response_ready.set()
+
+
+# Connection in use by kodi_rpc(), if any
+_event_socket = None
+_tcp_retry_delay = 0      # seconds to wait after the next failed attempt
+_tcp_retry_time = 0       # time before which no attempt is made
+
+
+def open_event_socket():
+    global _event_socket
+    close_event_socket()
+    try:
+        tcp_conn = KodiEventSocket(_tcp_host, TCP_PORT)
+        tcp_conn.connect()
+        _event_socket = tcp_conn
+        print(datetime.now(), "Listening for Kodi notifications on port", TCP_PORT)
+    except OSError as e:
+        print(datetime.now(), "Unable to open Kodi TCP connection (", e, ").  Polling instead.")
+
+
+def close_event_socket():
+    global _event_socket
+    if _event_socket:
+        _event_socket.close()
+        _event_socket = None
+
+
+# Open the TCP connection if it is missing or has been lost, backing
+# off between attempts.  With immediately set, any backoff is reset.
+def maintain_event_socket(immediately=False):
+    global _tcp_retry_delay, _tcp_retry_time
+    if immediately:
+        _tcp_retry_delay = 0
+        _tcp_retry_time = 0
+
+    if _event_socket:
+        if _event_socket.connected:
+            _tcp_retry_delay = 0
+            _tcp_retry_time = 0
+            return
+        print(datetime.now(), "Kodi TCP connection lost.  Polling until it is reopened.")
+        close_event_socket()
+
+    now = time.time()
+    if now < _tcp_retry_time:
+        return
+
+    # The delay only resets once a connection survives until the next
+    # check, so one that Kodi drops right away still gets backed off
+    _tcp_retry_delay = min(max(2 * _tcp_retry_delay, 5), TCP_RETRY_MAX)
+    _tcp_retry_time = now + _tcp_retry_delay
+    open_event_socket()
+
+
 #
 # Which display screens are enabled for use?
 #
@@ -568,6 +864,419 @@ else:
     STATUS_ENABLED = 0
 
 
+# Batched JSON-RPC
+# ----------------
+#
+# Kodi accepts a JSON array of requests, answering with an array of
+# responses (matched up by id, as order isn't guaranteed).  With
+# BATCH_RPC enabled, update_display() asks for the active players and
+# the union of all InfoLabels it might need (see batch_label_request)
+# in one round trip.  Each screen then receives just its own labels,
+# exactly as if they had been requested separately.
+BATCH_RPC = config.settings.get("BATCH_RPC", True)
+
+
+# Serialize (and remember) a batched call asking for the active
+# players and the given tuple of InfoLabels.  If clock_pid is given,
+# the playback clock properties for that player are requested too.
+@lru_cache(maxsize=16)
+def batch_payload(labels, clock_pid=None):
+    batch = [
+        {"jsonrpc": "2.0", "method": "Player.GetActivePlayers", "id": 3},
+        {"jsonrpc": "2.0", "method": "XBMC.GetInfoLabels",
+         "params": {"labels": list(labels)}, "id": "4all"},
+    ]
+    if clock_pid is not None:
+        batch.append({"jsonrpc": "2.0", "method": "Player.GetProperties",
+                      "params": {"playerid": clock_pid,
+                                 "properties": _CLOCK_PROPERTIES},
+                      "id": "5clk"})
+    return json.dumps(batch).encode("utf-8")
+
+
+# Serialize (and remember) a request for a tuple of InfoLabels
+@lru_cache(maxsize=16)
+def label_payload(labels):
+    return rpc_payload("XBMC.GetInfoLabels", {"labels": list(labels)}, "4p")
+
+
+# Retrieve a tuple of InfoLabels needed for one screen.  If a batched
+# response already holds them, the labels are just picked out of it;
+# otherwise a separate JSON-RPC call is made.  Either way, the return
+# value resembles a normal XBMC.GetInfoLabels response.
+def get_labels(label_list, batch_labels=None):
+    if (batch_labels is None or
+            any(label not in batch_labels for label in label_list)):
+        return kodi_rpc(label_payload(label_list), "XBMC.GetInfoLabels")
+    return {"result": {label: batch_labels.get(label, "")
+                       for label in label_list}}
+
+
+# Playback Clock
+# --------------
+#
+# During playback, the only InfoLabel that normally changes from one
+# update to the next is the elapsed time.  With USE_PLAYBACK_CLOCK
+# enabled, each query of Kodi also retrieves the player's numeric
+# time, total time, and speed via Player.GetProperties.  For the
+# updates in between, update_display() skips Kodi entirely and reuses
+# the previous InfoLabels, with MusicPlayer.Time or VideoPlayer.Time
+# advanced locally at the current playback speed.
+#
+# Kodi is queried again after CLOCK_RESYNC seconds, once the clock
+# reaches the end of the media, upon a screen press, and (when using
+# USE_TCP_EVENTS) whenever Kodi sends a player notification.  Without
+# notifications, a skip or pause made at Kodi can take up to
+# CLOCK_RESYNC seconds to show up on the panel.
+#
+USE_PLAYBACK_CLOCK = config.settings.get("USE_PLAYBACK_CLOCK", False)
+CLOCK_RESYNC       = config.settings.get("CLOCK_RESYNC", 10)  # seconds
+
+_CLOCK_PROPERTIES = ["time", "totaltime", "speed"]
+
+# Player.GetProperties requests, by playerid (see also batch_payload)
+_PAYLOAD_CLOCK = {}
+for clock_pid in (0, 1):
+    _PAYLOAD_CLOCK[clock_pid] = rpc_payload(
+        "Player.GetProperties",
+        {"playerid": clock_pid, "properties": _CLOCK_PROPERTIES}, "5clk")
+
+
+# Convert a Kodi Player.GetProperties time object to seconds
+def kodi_time_secs(kodi_time):
+    return (kodi_time.get("hours", 0) * 3600 +
+            kodi_time.get("minutes", 0) * 60 +
+            kodi_time.get("seconds", 0) +
+            kodi_time.get("milliseconds", 0) / 1000)
+
+
+class PlaybackClock:
+    def __init__(self):
+        self.playerid = None   # retained across invalidate()
+        self.invalidate()
+
+    # Force the next update to query Kodi
+    def invalidate(self):
+        self.stale = False     # set upon Kodi notifications
+        self.players = None    # Player.GetActivePlayers response
+        self.labels = None     # InfoLabels from the last query
+        self.time_label = None
+        self.position = 0.0
+        self.total = 0.0
+        self.speed = 0
+        self.synced_at = 0.0
+
+    # Record the results of a query of Kodi.  The props argument is the
+    # Player.GetProperties response, which must be for the active player.
+    def sync(self, players, labels, props):
+        self.invalidate()
+        try:
+            active = players['result'][0]
+            self.playerid = active['playerid']
+            if (not labels or not props or
+                    props.get('id') != "5clk" or 'result' not in props):
+                return
+            if active['type'] == 'audio':
+                self.time_label = "MusicPlayer.Time"
+            elif active['type'] == 'video':
+                self.time_label = "VideoPlayer.Time"
+            else:
+                return
+            self.position = kodi_time_secs(props['result']['time'])
+            self.total = kodi_time_secs(props['result']['totaltime'])
+            self.speed = props['result']['speed']
+        except (KeyError, IndexError, TypeError):
+            return
+        self.players = players
+        self.labels = labels
+        self.synced_at = time.monotonic()
+
+    def elapsed(self):
+        position = self.position + self.speed * (time.monotonic() - self.synced_at)
+        if position < 0:
+            position = 0
+        if self.total > 0 and position > self.total:
+            position = self.total
+        return position
+
+    # Is it time to ask Kodi again?
+    def expired(self):
+        if (self.players is None or self.stale):
+            return True
+        if time.monotonic() - self.synced_at >= CLOCK_RESYNC:
+            return True
+        if self.speed and self.total > 0 and self.elapsed() >= self.total:
+            return True
+        return False
+
+    # InfoLabels from the last query, with the elapsed time advanced.
+    # Formatting follows Kodi's, switching to hours once the media is
+    # at least an hour long.
+    def info(self):
+        secs = int(round(self.elapsed()))
+        if self.total >= 3600 or secs >= 3600:
+            time_str = "%02d:%02d:%02d" % (secs // 3600, (secs // 60) % 60, secs % 60)
+        else:
+            time_str = "%02d:%02d" % (secs // 60, secs % 60)
+        labels = dict(self.labels)
+        labels[self.time_label] = time_str
+        return labels
+
+
+_clock = PlaybackClock()
+
+
+# Per-Layout InfoLabels
+# ---------------------
+#
+# Rather than always asking Kodi for every entry in STATUS_LABELS,
+# AUDIO_LABELS, VIDEO_LABELS, or SLIDESHOW_LABELS, each layout gets
+# examined (upon first use) for the labels it can actually display:
+# field names, format_str placeholders, display_if / display_ifnot
+# operands, and use_path keys, across the fields array as well as the
+# thumb and prog entries.  Code outside of the layouts relies upon the
+# few additional labels listed in _REQUIRED_LABELS.
+#
+# Element and string callbacks (and layout selection functions)
+# declare which labels they read via the CALLBACK_LABELS table, found
+# after STRING_CB below.  A layout using a callback lacking such a
+# declaration just falls back to the screen's full list.
+#
+# Only labels within the screen's full list are ever requested, so a
+# field naming some other InfoLabel behaves just as it did before.
+#
+
+# Labels that identify the media being played
+_IDENTITY_LABELS = {
+    "audio": ["Player.Filenameandpath",
+              "MusicPlayer.Title",
+              "MusicPlayer.Album",
+              "MusicPlayer.TrackNumber",
+              "MusicPlayer.Duration",
+              "MusicPlayer.Cover"],
+    "video": ["Player.Filenameandpath",
+              "VideoPlayer.Title",
+              "VideoPlayer.Episode",
+              "VideoPlayer.Duration",
+              "VideoPlayer.Cover"],
+}
+
+_TIME_LABEL = {
+    "audio": "MusicPlayer.Time",
+    "video": "VideoPlayer.Time",
+}
+
+# Labels examined by update_display(), audio_screens(), etc.
+_REQUIRED_LABELS = {
+    "status": [],
+    "audio":  _IDENTITY_LABELS["audio"] + [_TIME_LABEL["audio"]],
+    "video":  _IDENTITY_LABELS["video"] + [_TIME_LABEL["video"]],
+    "slide":  [],
+}
+
+
+# Look up the layout dictionary, full label list, and (if layout
+# autoselection is enabled) the selection function for a kind of
+# screen: "status", "audio", "video", or "slide".
+def screen_tables(kind):
+    if kind == "status":
+        return {"STATUS_LAYOUT": STATUS_LAYOUT}, STATUS_LABELS, None
+    elif kind == "audio":
+        return (AUDIO_LAYOUT, AUDIO_LABELS,
+                AUDIO_SELECT_FUNC if AUDIO_LAYOUT_AUTOSELECT else None)
+    elif kind == "video":
+        return (VIDEO_LAYOUT, VIDEO_LABELS,
+                VIDEO_SELECT_FUNC if VIDEO_LAYOUT_AUTOSELECT else None)
+    else:
+        return (SLIDESHOW_LAYOUT, SLIDESHOW_LABELS,
+                SLIDESHOW_SELECT_FUNC if SLIDESHOW_LAYOUT_AUTOSELECT else None)
+
+
+# Name of the layout presently in use for a kind of screen
+def current_layout_name(kind):
+    if kind == "audio":
+        return audio_dmode.name
+    elif kind == "video":
+        return video_dmode.name
+    elif kind == "slide":
+        return slide_dmode.name
+    return "STATUS_LAYOUT"
+
+
+# Labels referenced by a single layout element (a field, thumb, or
+# prog dictionary), or None if an undeclared callback is involved.
+def element_labels(field_dict):
+    names = compile_format(field_dict.get("format_str", "")).names()
+    for key in ("name", "use_path"):
+        if key in field_dict:
+            names.append(field_dict[key])
+    for key in ("display_if", "display_ifnot"):
+        if type(field_dict.get(key)) == list:
+            names.append(field_dict[key][0])
+
+    labels = []
+    for name in names:
+        callback = ELEMENT_CB.get(name, STRING_CB.get(name))
+        if callback is None:
+            labels.append(name)
+        elif callback in CALLBACK_LABELS:
+            labels += CALLBACK_LABELS[callback]
+        else:
+            return None
+    return labels
+
+
+# Determine the tuple of InfoLabels needed to render a layout.  With
+# dynamic_only set, just the labels needed for an update that reuses
+# the static portion of the screen (see Split InfoLabel Retrieval
+# below) are returned, or None if that cannot be determined.
+@lru_cache(maxsize=64)
+def layout_label_request(kind, layout_name, dynamic_only=False):
+    layouts, full_list, select_func = screen_tables(kind)
+    full_list = tuple(dict.fromkeys(full_list))
+    layout = layouts[layout_name]
+
+    wanted = list(_REQUIRED_LABELS[kind])
+
+    elements = layout.get("fields", [])
+    if dynamic_only:
+        elements = [field for field in elements if field.get("dynamic", 0)]
+    else:
+        elements = list(elements)
+        if "thumb" in layout:
+            elements.append(layout["thumb"])
+    if "prog" in layout:
+        elements.append(layout["prog"])
+
+    for field_dict in elements:
+        labels = element_labels(field_dict)
+        if labels is None:
+            return None if dynamic_only else full_list
+        wanted += labels
+
+    if (select_func and not dynamic_only):
+        if select_func not in CALLBACK_LABELS:
+            return full_list
+        wanted += CALLBACK_LABELS[select_func]
+
+    return tuple(label for label in dict.fromkeys(wanted)
+                 if label in full_list)
+
+
+# Labels for a kind of screen, covering either its current layout or
+# all of its layouts.  With layout autoselection, any of the layouts
+# might get chosen, so all of them are always covered.
+def screen_label_request(kind, all_layouts=False):
+    layouts, full_list, select_func = screen_tables(kind)
+    if (all_layouts or select_func):
+        names = tuple(name for name in layouts)
+    else:
+        names = (current_layout_name(kind),)
+    return _combined_label_request(kind, names)
+
+
+@lru_cache(maxsize=64)
+def _combined_label_request(kind, layout_names):
+    labels = []
+    for name in layout_names:
+        labels += layout_label_request(kind, name)
+    return tuple(dict.fromkeys(labels))
+
+
+# Print the label requests for every layout
+def report_label_requests():
+    print(datetime.now(), "InfoLabels requested per layout:")
+    for kind, enabled in (("status", STATUS_ENABLED),
+                          ("audio", AUDIO_ENABLED),
+                          ("video", VIDEO_ENABLED),
+                          ("slide", SLIDESHOW_ENABLED)):
+        if not enabled:
+            continue
+        layouts, full_list, select_func = screen_tables(kind)
+        for name in layouts:
+            request = layout_label_request(kind, name)
+            print("  %-16s %2d of %2d: %s" %
+                  (name, len(request), len(full_list), ", ".join(request)))
+
+
+# Split InfoLabel Retrieval
+# -------------------------
+#
+# Most InfoLabels (album, genre, codec, cover, ...) only change along
+# with the track.  With SPLIT_LABELS enabled, ordinary updates during
+# audio or video playback ask Kodi only for the labels used by the
+# active layout's dynamic fields and progress bar, plus the handful of
+# cheap labels in _IDENTITY_LABELS.  While that identity stays the
+# same, all other labels are carried over from the last full
+# retrieval.  A new identity, a screen press, or a change in the kind
+# of media playing results in a full retrieval.
+#
+SPLIT_LABELS = config.settings.get("SPLIT_LABELS", True)
+
+# Result of the last full retrieval, and the identity it belongs to
+_split_kind = None        # "audio" or "video"
+_split_identity = None
+_split_labels = None
+
+
+# Labels to ask for in a batched call.  While the same kind of media
+# keeps playing, that is just what the active layout's dynamic fields
+# need.  Otherwise, every enabled screen's current layout is covered
+# (or all of the layouts, if a screen press is pending).
+def batch_label_request(all_layouts=False):
+    if (SPLIT_LABELS and _split_kind and not all_layouts):
+        plan = layout_label_request(_split_kind,
+                                    current_layout_name(_split_kind),
+                                    dynamic_only=True)
+        if plan is not None:
+            return plan
+
+    labels = []
+    for kind, enabled in (("status", STATUS_ENABLED),
+                          ("audio", AUDIO_ENABLED),
+                          ("video", VIDEO_ENABLED),
+                          ("slide", SLIDESHOW_ENABLED)):
+        if enabled:
+            labels += screen_label_request(kind, all_layouts)
+    return tuple(dict.fromkeys(labels))
+
+
+# Retrieve the InfoLabels for an audio or video screen, combining the
+# labels for an ordinary update with those carried over from the last
+# full retrieval when the identity is unchanged.  Setting force
+# demands a full retrieval.
+def get_split_labels(kind, batch_labels=None, force=False):
+    global _split_kind, _split_identity, _split_labels
+
+    plan = None
+    if (SPLIT_LABELS and not force and _split_kind == kind):
+        plan = layout_label_request(kind, current_layout_name(kind),
+                                    dynamic_only=True)
+
+    if plan is not None:
+        if (batch_labels is not None and
+                all(label in batch_labels for label in plan)):
+            partial = batch_labels
+        else:
+            partial = kodi_rpc(label_payload(plan),
+                               "XBMC.GetInfoLabels").get("result", {})
+
+        identity = [partial.get(label, "") for label in _IDENTITY_LABELS[kind]]
+        if identity == _split_identity:
+            labels = dict(_split_labels)
+            for label in plan:
+                labels[label] = partial.get(label, "")
+            return {"result": labels}
+
+    response = get_labels(screen_label_request(kind), batch_labels)
+    if (SPLIT_LABELS and "result" in response):
+        _split_kind = kind
+        _split_identity = [response["result"].get(label, "")
+                           for label in _IDENTITY_LABELS[kind]]
+        _split_labels = response["result"]
+    return response
+
+
 # GPIO assignments and display options
 # ------------------------------------
 #
@@ -597,6 +1306,7 @@ TOUCH_CALL_UPDATE = config.settings.get("TOUCH_CALL_UPDATE", False)
 # Internal state variables used to manage screen presses
 _kodi_connected = False
 _kodi_playing   = False
+_kodi_playerid  = 0       # id of the active player, if any
 _screen_press   = False
 _screen_active  = False
 
@@ -865,12 +1575,14 @@ def element_audio_cover(image, draw, info, field, screen_mode, layout_name):
     if _airtunes_re.match(image_path):
         artwork = get_airplay_art(image_path, None,
                                   field["size"], field["size"],
-                                  enlarge=field.get("enlarge", False))
+                                  enlarge=field.get("enlarge", False),
+                                  resample=field.get("resample", ART_RESAMPLE))
     else:
-        artwork = get_artwork(image_path,
-                              field["size"], field["size"],
-                              use_defaults=True,
-                              enlarge=field.get("enlarge", False))
+        artwork = load_artwork(image_path,
+                               field["size"], field["size"],
+                               use_defaults=True,
+                               enlarge=field.get("enlarge", False),
+                               resample=field.get("resample", ART_RESAMPLE))
 
     if artwork:
         paste_artwork(image, artwork, field)
@@ -900,10 +1612,14 @@ def element_generic_artwork(image, draw, info, field, screen_mode, layout_name):
     # The following is somewhat redundate with code that
     # exists in video_screen_static().
     artwork = None
-    artwork = get_artwork(image_path,
-                          field["width"], field["height"],
-                          use_defaults=True,
-                          enlarge=field.get("enlarge", False))
+    artwork = load_artwork(image_path,
+                           field["width"], field["height"],
+                           use_defaults=True,
+                           enlarge=field.get("enlarge", False),
+                           resample=field.get("resample", ART_RESAMPLE),
+                           placeholder=("DefaultVideoCover"
+                                        if screen_mode == ScreenMode.VIDEO
+                                        else "DefaultAlbumCover"))
     if artwork:
         paste_artwork(image, artwork, field)
 
@@ -928,20 +1644,46 @@ def strcb_kodi_version(info, screen_mode, layout_name):
 
 # Render current time and, in what should be a smaller font, AM/PM.
 # Return an empty string so as not to confuse the caller.
+#
+# With glyphs set for the field, both parts are drawn using a Glyph
+# Atlas.  A 24-hour clock has no AM/PM part at all.
 def element_time_hrmin(image, draw, info, field, screen_mode, layout_name):
     if "System.Time" in info:
         time_parts = info['System.Time'].split(" ")
-        time_width, time_height = draw.textsize(time_parts[0], field["font"])
-        draw.text((field["posx"], field["posy"]),
+        if field.get("glyphs", False):
+            draw_time = draw_glyphs
+            time_width = font_metrics(field["font"]).width(time_parts[0])
+        else:
+            draw_time = draw_text
+            time_width, time_height = draw.textsize(time_parts[0], field["font"])
+        draw_time(draw, (field["posx"], field["posy"]),
                   time_parts[0],
                   field["fill"], field["font"])
-        draw.text((field["posx"] + time_width + 5, field["posy"]),
-                  time_parts[1],
-                  field["fill"], field["smfont"])
+        if len(time_parts) > 1:
+            draw_time(draw, (field["posx"] + time_width + 5, field["posy"]),
+                      time_parts[1],
+                      field["fill"], field["smfont"])
 
     return ""
 
 
+# Bounding box of whatever element_time_hrmin() draws (see
+# CALLBACK_BOUNDS)
+def bounds_time_hrmin(image, draw, info, field, screen_mode, layout_name):
+    if "System.Time" not in info:
+        return None
+    time_parts = info['System.Time'].split(" ")
+    glyphs = field.get("glyphs", False)
+    box = text_bounds(draw, (field["posx"], field["posy"]),
+                      time_parts[0], field["font"], glyphs)
+    if len(time_parts) > 1:
+        time_width = font_metrics(field["font"]).width(time_parts[0])
+        box = union_box(box, text_bounds(draw,
+                                         (field["posx"] + time_width + 5, field["posy"]),
+                                         time_parts[1], field["smfont"], glyphs))
+    return box
+
+
 # Dictionaries of element and string callback functions, with each key
 # corresponding to the "name" specified for a field (within a layout's
 # array named "fields").
@@ -1032,6 +1774,49 @@ STRING_CB = {
     }
 
 
+# InfoLabels examined by each callback function, used to work out
+# which labels a layout requires (see Per-Layout InfoLabels).  A user
+# script adding its own callbacks should add entries here as well,
+# e.g.
+#
+#   kodi_panel_display.CALLBACK_LABELS[my_func] = ["MusicPlayer.Mood"]
+#
+# Otherwise, layouts using such callbacks retrieve every label in
+# their screen's list.
+
+CALLBACK_LABELS = {
+    element_empty        : [],
+    element_audio_artist : ["MusicPlayer.Artist",
+                            "MusicPlayer.Property(Role.Composer)"],
+    element_audio_cover  : ["MusicPlayer.Cover"],
+    element_time_hrmin   : ["System.Time"],
+    element_thin_line    : [],
+    element_generic_artwork : ["VideoPlayer.Cover"],
+
+    strcb_empty          : [],
+    strcb_codec          : ["MusicPlayer.Codec"],
+    strcb_full_codec     : ["MusicPlayer.Codec",
+                            "MusicPlayer.BitsPerSample",
+                            "MusicPlayer.SampleRate"],
+    strcb_audio_duration : ["MusicPlayer.Duration"],
+    strcb_acodec         : ["VideoPlayer.AudioCodec"],
+    strcb_version        : [],
+    strcb_kodi_version   : ["System.BuildVersion", "System.BuildDate"],
+    strcb_upnp_playback  : ["Player.Filenameandpath"],
+    }
+
+
+# Element callbacks can also provide a function that, given the same
+# arguments, returns the bounding box of what they would draw (or
+# None).  Dirty-Region Rendering otherwise has to find that extent by
+# drawing into a copy of the entire static image and comparing the
+# two, which is costly for an element redrawn every minute or second.
+
+CALLBACK_BOUNDS = {
+    element_time_hrmin   : bounds_time_hrmin,
+    }
+
+
 # ----------------------------------------------------------------------------
 
 # Text wrapping from public blog post
@@ -1041,63 +1826,197 @@ STRING_CB = {
 # by Bach Ton That, with further modifications.  With the 800x480
 # example layout, having the album title to the right of the cover art
 # works better if one can wrap it across at least two lines.
+#
+# Font Metrics
+# ------------
+#
+# Originally, truncation removed one character at a time and wrapping
+# re-measured the entire line for each added word, with every step a
+# full text layout by FreeType.  For the long titles typical of
+# classical music, that adds up to hundreds of measurements.
+#
+# Instead, each font gets a FontMetrics object that caches glyph
+# advances and kerning adjustments, from which the width of any
+# prefix can be estimated cheaply.  That estimate picks where to
+# look, with the actual cut determined by a search using exact
+# measurements (font.getsize(), also cached) -- typically just two or
+# three of them.  Results are identical to the original one-at-a-time
+# approach.
+#
+
+class FontMetrics:
+    def __init__(self, font):
+        self.font = font
+        self.advances = {}     # character -> advance width
+        self.kerning = {}      # character pair -> kerning adjustment
+        self.widths = {}       # string -> exact width
+        self.line_height = font.getsize('Ahgy')[1]
+        self.ellipsis = font.getsize("\u2026")[0]
+
+    def _length(self, text):
+        if hasattr(self.font, "getlength"):
+            return self.font.getlength(text)
+        return self.font.getsize(text)[0]
+
+    # Exact width of text, as rendered
+    def width(self, text):
+        w = self.widths.get(text)
+        if w is None:
+            if len(self.widths) >= 1024:
+                self.widths.clear()
+            w = self.widths[text] = self.font.getsize(text)[0]
+        return w
+
+    # Estimated widths of each prefix of text (0 through len(text)
+    # characters), from glyph advances and kerning
+    def prefix_widths(self, text):
+        advances = self.advances
+        kerning = self.kerning
+        widths = [0]
+        total = 0
+        prev = None
+        for ch in text:
+            adv = advances.get(ch)
+            if adv is None:
+                adv = advances[ch] = self._length(ch)
+            total += adv
+            if prev is not None:
+                pair = prev + ch
+                kern = kerning.get(pair)
+                if kern is None:
+                    kern = kerning[pair] = (self._length(pair) -
+                                            advances[prev] - adv)
+                total += kern
+            widths.append(total)
+            prev = ch
+        return widths
+
+
+_font_metrics = {}
+
+
+def font_metrics(font):
+    metrics = _font_metrics.get(font)
+    if metrics is None:
+        metrics = _font_metrics[font] = FontMetrics(font)
+    return metrics
+
+
+# Largest n between lo and hi for which width(n) <= limit, given that
+# width() never decreases as n grows and width(lo) fits.  The search
+# starts at guess, expanding outwards until the answer is bracketed.
+def _largest_fitting(width, lo, hi, limit, guess):
+    good, bad = lo, hi + 1
+    guess = min(max(guess, lo), hi)
+    step = 1
+    if width(guess) <= limit:
+        good = guess
+        while good + step < bad:
+            if width(good + step) > limit:
+                bad = good + step
+                break
+            good += step
+            step *= 2
+    else:
+        bad = guess
+        while bad - step > good:
+            if width(bad - step) <= limit:
+                good = bad - step
+                break
+            bad -= step
+            step *= 2
+
+    while bad - good > 1:
+        mid = (good + bad) // 2
+        if width(mid) <= limit:
+            good = mid
+        else:
+            bad = mid
+    return good
+
+
+# Number of entries in estimates (ascending) that are at most limit
+def _count_within(estimates, limit):
+    lo, hi = 0, len(estimates)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if estimates[mid] <= limit:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
 
-@lru_cache(maxsize=20)
+@lru_cache(maxsize=128)
 def truncate_line(line, font, max_width):
-    truncating = 0
-    new_text = line
+    metrics = font_metrics(font)
 
-    # Form an initial estimate of how many characters will fit,
-    # leaving some margin.
-    t_width = font.getsize(line)[0]
+    t_width = metrics.width(line)
     if t_width <= max_width:
         return line
 
-    avg_char = len(new_text) / t_width
-    num_chars = int(max_width / avg_char) + 4
-    new_text = new_text[0:num_chars]
+    # Form an initial estimate of how many characters will fit,
+    # leaving some margin.
+    avg_char = len(line) / t_width
+    num_chars = min(int(max_width / avg_char) + 4, len(line))
 
     # Leave room for ellipsis
-    avail_width = max_width - font.getsize("\u2026")[0] + 6
+    avail_width = max_width - metrics.ellipsis + 6
 
-    # Now perform naive truncation
-    t_width = font.getsize(new_text)[0]
-    while (t_width > avail_width):
-        truncating = 1
-        new_text = new_text[:-1]
-        t_width = font.getsize(new_text)[0]
+    # Keep the longest prefix, up to that estimate, that fits
+    estimates = metrics.prefix_widths(line[0:num_chars])
+    keep = _largest_fitting(lambda n: metrics.width(line[0:n]),
+                            0, num_chars, avail_width,
+                            _count_within(estimates, avail_width) - 1)
 
-    final_text = new_text
-    if truncating:
+    final_text = line[0:keep]
+    if keep < num_chars:
         final_text += "\u2026"
 
     return final_text
 
 
-@lru_cache(maxsize=20)
+@lru_cache(maxsize=128)
 def text_wrap(text, font, max_width, max_lines=None):
     lines = []
+    metrics = font_metrics(font)
 
     # If the width of the text is smaller than image width
     # we don't need to split it, just add it to the lines array
     # and return
-    if font.getsize(text)[0] <= max_width:
+    if metrics.width(text) <= max_width:
         lines.append(text)
     elif max_lines and max_lines == 1:
         # only a single line available, so just truncate
         lines.append(truncate_line(text, font, max_width))
     else:
-        # split the line by spaces to get words
+        # split the line by spaces to get words, noting where each
+        # word ends within the text
         words = text.split(' ')
+        ends = []
+        offset = -1
+        for word in words:
+            offset += len(word) + 1
+            ends.append(offset)
+        estimates = metrics.prefix_widths(text)
+
         i = 0
-        # append every word to a line while its width is shorter than max width
+        # append as many words to a line as fit within max width
         while i < len(words):
-            line = ''
-            while i < len(words) and font.getsize(
-                    line + words[i])[0] <= max_width:
-                line = line + words[i] + " "
-                i += 1
-            if not line:
+            start = ends[i] - len(words[i])
+            limit = estimates[start] + max_width
+            guess = i
+            while (guess < len(words) and estimates[ends[guess]] <= limit):
+                guess += 1
+
+            count = _largest_fitting(
+                lambda n: metrics.width(" ".join(words[i:i + n])) if n else 0,
+                0, len(words) - i, max_width, guess - i)
+
+            if count:
+                line = "".join(word + " " for word in words[i:i + count])
+                i += count
+            else:
                 line = words[i]
                 i += 1
             # when the line gets longer than the max width do not append the word,
@@ -1117,10 +2036,10 @@ def text_wrap(text, font, max_width, max_lines=None):
 # if the string is too wide to display in its entirety.
 def render_text_wrap(pil_draw, xy, text, max_width, max_lines, fill, font):
     line_array = text_wrap(text, font, max_width, max_lines)
-    line_height = font.getsize('Ahgy')[1]
+    line_height = font_metrics(font).line_height
     (posx, posy) = xy
     for line in line_array:
-        pil_draw.text((posx, posy), line, fill, font)
+        draw_text(pil_draw, (posx, posy), line, fill, font)
         posy = posy + line_height
     return
 
@@ -1216,129 +2135,725 @@ def progress_bar(draw,
 # via a special:// path that must also, if running remotely from Kodi,
 # be enabled as a media source in order for HTTP retrieval to work.
 #
-# Since the name (and path) are always the same, this function checks
-# the modification time of the temporary file to decide whether a
-# re-fetching is needed.
+# Since the name (and path) are always the same, the file must be
+# checked for changes.  Rather than asking Kodi about it on every
+# update, that check happens at most once every AIRPLAY_CHECK_INTERVAL
+# seconds, with the result shared by all callers:
+#
+#   - With Kodi running locally, the file's modification time is
+#     examined directly.
+#
+#   - Otherwise, a conditional HTTP GET (If-None-Match and
+#     If-Modified-Since) is made for the file's URL, which only needs
+#     Files.PrepareDownload once.  Should the web server ignore those
+#     headers, the file is downloaded but only decoded again if its
+#     contents changed.
+#
+# Resized copies are kept for each size requested, until the cover
+# changes.  While the static frame is reused, audio_screens() checks
+# for such a change via check_airplay_art().  The prev_image argument
+# is no longer needed, and is only retained for the sake of existing
+# callers.
+#
+AIRPLAY_CHECK_INTERVAL = config.settings.get("AIRPLAY_CHECK_INTERVAL", 2)
+AIRPLAY_TEMP_DIR = config.settings.get("AIRPLAY_TEMP_DIR", "/storage/.kodi/temp/")
+
+
+class AirPlayCover:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cover_path = None
+        self.checked_at = 0
+        self.validators = {}      # request headers for conditional GET
+        self.version = None       # mtime or content hash of the cover
+        self.data = None          # undecoded cover, or None if absent
+        self.sized = {}           # (width, height, enlarge, resample) -> image
+
+    # Check for a new cover, if due.  Returns True if it changed.
+    def refresh(self, cover_path):
+        global _last_image_time
+        now = time.monotonic()
+        if (cover_path == self.cover_path and
+                now - self.checked_at < AIRPLAY_CHECK_INTERVAL):
+            return False
+
+        if cover_path != self.cover_path:
+            self.cover_path = cover_path
+            self.validators = {}
+        self.checked_at = now
+
+        if _local_kodi:
+            version, data = self._check_local(cover_path)
+        else:
+            version, data = self._check_remote(cover_path)
+
+        if version == self.version:
+            return False
+        if DEBUG_ART: print(datetime.now(), "AirPlay cover changed:", version)
+        self.version = version
+        self.data = data
+        self.sized = {}
+        _last_image_time = version
+        return True
+
+    def _check_local(self, cover_path):
+        filename = os.path.join(AIRPLAY_TEMP_DIR,
+                                _airtunes_re.match(cover_path).group(1))
+        try:
+            version = os.stat(filename).st_mtime
+            if version == self.version:
+                return version, self.data
+            with open(filename, "rb") as f:
+                return version, f.read()
+        except OSError:
+            return None, None
+
+    def _check_remote(self, cover_path):
+        image_url = resolve_art_url(cover_path)
+        if DEBUG_ART: print("Airplay image_url : ", image_url) # debug info
+        if image_url is None:
+            return None, None
+
+        r = kodi_get(image_url, headers=self.validators)
+        if r.status_code == 304:
+            return self.version, self.data
+        if r.status_code != 200:
+            forget_art_url(cover_path)
+            return None, None
+
+        self.validators = {}
+        if "ETag" in r.headers:
+            self.validators["If-None-Match"] = r.headers["ETag"]
+        if "Last-Modified" in r.headers:
+            self.validators["If-Modified-Since"] = r.headers["Last-Modified"]
+        return hashlib.sha1(r.content).hexdigest(), r.content
+
+    # Return the current cover at the given size, or None
+    def image(self, thumb_width, thumb_height, enlarge=False, resample="default"):
+        global _image_default
+        if self.data is None:
+            return None
+
+        key = (thumb_width, thumb_height, enlarge, resample)
+        if key not in self.sized:
+            try:
+                cover = Image.open(io.BytesIO(self.data))
+                _image_default = False
+            except BaseException:
+                cover = Image.open(_default_audio_thumb)
+                _image_default = True
+
+            if (enlarge and (cover.size[0] < thumb_width or
+                             cover.size[1] < thumb_height)):
+                ratio = min(thumb_width / float(cover.size[0]),
+                            thumb_height / float(cover.size[1]))
+                cover = cover.resize((int(cover.size[0] * ratio),
+                                      int(cover.size[1] * ratio)))
+            else:
+                reduce_artwork(cover, thumb_width, thumb_height, resample)
+            self.sized[key] = cover
+        return self.sized[key]
+
+
+_airplay_cover = AirPlayCover()
+
+
+def get_airplay_art(cover_path, prev_image, thumb_width, thumb_height, enlarge=False,
+                    resample="default"):
+    with _airplay_cover.lock:
+        _airplay_cover.refresh(cover_path)
+        return _airplay_cover.image(thumb_width, thumb_height, enlarge, resample)
+
+
+# Check for a new AirPlay cover while the static frame is being
+# reused, having it rebuilt if the cover changed
+def check_airplay_art(cover_path):
+    with _airplay_cover.lock:
+        if _airplay_cover.refresh(cover_path):
+            _art_arrived.set()
+
+
+
+# Artwork Disk Cache
+# ------------------
+#
+# The memory cache behind get_artwork() only lasts as long as the
+# process.  If ART_CACHE_DIR is specified,
+# resized artwork also gets saved there (as PNG, so that nothing is
+# lost relative to the in-memory copy), keyed by the cover path and
+# the requested size.  Repeat albums, even right after a restart, can
+# then be displayed without any network activity.
+#
+# To keep writes to an SD card down:
 #
-# Due to that time-check we do NOT make use of lru_cache decoration.
-# This function therefore still relies upon the caller passing in
-# the previously-fetched AirPlay cover (as prev_image).
+#   - each piece of artwork is written just once per size,
+#   - a cache hit only refreshes a file's modification time (used
+#     for LRU eviction) if it is more than ART_CACHE_TOUCH seconds
+#     old, and
+#   - each new Files.PrepareDownload path resolution is appended,
+#     as one line, to a journal.
 #
+# Files are written to a temporary name and then renamed into place,
+# so a power loss cannot leave a partial image behind.  Once the
+# cache exceeds ART_CACHE_MB megabytes, the least-recently used
+# images are removed.
+#
+# Only the ART_PATHS_MAX most recently used path resolutions are
+# kept.  The journal is rewritten with just those once it holds twice
+# that many lines.
+#
+ART_CACHE_DIR   = config.settings.get("ART_CACHE_DIR", "")
+ART_CACHE_MB    = config.settings.get("ART_CACHE_MB", 32)
+ART_CACHE_TOUCH = config.settings.get("ART_CACHE_TOUCH", 3600)
+ART_PATHS_MAX   = config.settings.get("ART_PATHS_MAX", 2000)
 
-def get_airplay_art(cover_path, prev_image, thumb_width, thumb_height, enlarge=False):
-    global _last_image_time, _image_default
-    image_url = None
-    image_set = False
-    resize_needed = False
-    cover = None  # used for retrieved artwork, original size
+# Pillow modes that survive a round trip through PNG
+_ART_CACHE_MODES = ("1", "L", "LA", "P", "RGB", "RGBA")
 
-    if not _local_kodi:
-        image_path = cover_path
-        if DEBUG_ART: print("Airplay image_path : ", image_path) # debug info
-
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "Files.GetFileDetails",
-            "params": {"file": image_path,
-                       "properties": ["lastmodified"]
-                       },
-            "id": "5b",
-        }
-        response = requests.post(
-            rpc_url,
-            data=json.dumps(payload),
-            headers=headers).json()
-        if DEBUG_ART:
-            print("Airplay image details: ", json.dumps(response))  # debug info
-
-        new_image_time = None
+_art_cache_lock = threading.Lock()
+_art_cache_size = 0       # total bytes of cached images
+_art_paths = {}           # cover path -> PrepareDownload result, oldest first
+_art_paths_file = None    # journal of path resolutions
+_art_paths_lines = 0      # lines in the journal
+
+
+# Scan the cache directory and load the saved path resolutions
+def art_cache_init():
+    global _art_cache_size, _art_paths, _art_paths_file, _art_paths_lines
+    if not ART_CACHE_DIR:
+        return
+
+    try:
+        os.makedirs(ART_CACHE_DIR, exist_ok=True)
+        _art_cache_size = sum(entry.stat().st_size
+                              for entry in os.scandir(ART_CACHE_DIR)
+                              if entry.name.endswith(".png"))
+    except OSError as err:
+        print(datetime.now(), "Artwork cache disabled:", err)
+        return
+
+    # Resolutions saved by earlier versions, as a single JSON object
+    _art_paths = {}
+    legacy_file = os.path.join(ART_CACHE_DIR, "paths.json")
+    try:
+        with open(legacy_file) as f:
+            _art_paths = json.load(f)
+    except (OSError, ValueError):
+        legacy_file = None
+
+    # Replay the journal, skipping any line cut short by a power loss
+    _art_paths_file = os.path.join(ART_CACHE_DIR, "paths.jsonl")
+    _art_paths_lines = 0
+    damaged = False
+    try:
+        with open(_art_paths_file) as f:
+            for line in f:
+                _art_paths_lines += 1
+                try:
+                    image_path, download_path = json.loads(line)
+                except (ValueError, TypeError):
+                    damaged = True
+                    continue
+                _art_paths.pop(image_path, None)
+                if download_path is not None:
+                    _art_paths[image_path] = download_path
+    except OSError:
+        pass
+
+    _art_paths_trim()
+    if (legacy_file or damaged or _art_paths_lines > 2 * ART_PATHS_MAX):
+        with _art_cache_lock:
+            _art_paths_compact()
+        if legacy_file:
+            try:
+                os.remove(legacy_file)
+            except OSError:
+                pass
+
+    if DEBUG_ART:
+        print(datetime.now(), "Artwork cache holds",
+              _art_cache_size // 1024, "KiB in", ART_CACHE_DIR)
+
+
+# Write data to a file in the cache directory, via a temporary file
+# and rename.  Returns the number of bytes written.
+def _art_cache_write(filename, data):
+    fd, tmp_name = tempfile.mkstemp(dir=ART_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, os.path.join(ART_CACHE_DIR, filename))
+    except BaseException:
         try:
-            new_image_time = response['result']['filedetails']['lastmodified']
-        except BaseException:
+            os.remove(tmp_name)
+        except OSError:
             pass
+        raise
+    return len(data)
+
+
+def _art_cache_name(cover_path, thumb_width, thumb_height, enlarge, resample):
+    key = "%s|%dx%d|%d" % (cover_path, thumb_width, thumb_height, enlarge)
+    if resample != "default":
+        key += "|" + resample
+    return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png"
+
+
+# Look up resized artwork, returning None if not present
+def art_cache_load(cover_path, thumb_width, thumb_height, enlarge=False,
+                   resample="default"):
+    if _art_paths_file is None:
+        return None
+
+    filename = os.path.join(
+        ART_CACHE_DIR,
+        _art_cache_name(cover_path, thumb_width, thumb_height, enlarge, resample))
+    try:
+        with open(filename, "rb") as f:
+            cover = Image.open(f)
+            cover.load()
+        if time.time() - os.path.getmtime(filename) > ART_CACHE_TOUCH:
+            os.utime(filename)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+    if DEBUG_ART: print("artwork from disk cache : ", cover_path)
+    return cover
+
+
+# Save resized artwork, evicting older images if needed
+def art_cache_store(cover, cover_path, thumb_width, thumb_height, enlarge=False,
+                    resample="default"):
+    global _art_cache_size
+    if (_art_paths_file is None or cover.mode not in _ART_CACHE_MODES):
+        return
+
+    data = io.BytesIO()
+    cover.save(data, "PNG")
+    filename = _art_cache_name(cover_path, thumb_width, thumb_height, enlarge, resample)
+
+    with _art_cache_lock:
+        try:
+            _art_cache_size += _art_cache_write(filename, data.getvalue())
+        except OSError as err:
+            print(datetime.now(), "Unable to save artwork to cache:", err)
+            return
+        if _art_cache_size > ART_CACHE_MB * 1024 * 1024:
+            art_cache_evict()
+
+
+# Remove least-recently used images until the cache is within 90% of
+# its budget.  The caller must hold _art_cache_lock.
+def art_cache_evict():
+    global _art_cache_size
+    budget = ART_CACHE_MB * 1024 * 1024 * 0.9
+    try:
+        entries = sorted((entry for entry in os.scandir(ART_CACHE_DIR)
+                          if entry.name.endswith(".png")),
+                         key=lambda entry: entry.stat().st_mtime)
+        _art_cache_size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if _art_cache_size <= budget:
+                break
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            _art_cache_size -= size
+            if DEBUG_ART: print("artwork cache evicted : ", entry.name)
+    except OSError as err:
+        print(datetime.now(), "Artwork cache eviction failed:", err)
+
+
+# Drop the least-recently used path resolutions beyond ART_PATHS_MAX
+def _art_paths_trim():
+    while len(_art_paths) > ART_PATHS_MAX:
+        del _art_paths[next(iter(_art_paths))]
+
+
+# Rewrite the journal with just the current path resolutions.  The
+# caller must hold _art_cache_lock.
+def _art_paths_compact():
+    global _art_paths_lines
+    lines = "".join(json.dumps([image_path, download_path]) + "\n"
+                    for image_path, download_path in _art_paths.items())
+    try:
+        _art_cache_write("paths.jsonl", lines.encode("utf-8"))
+    except OSError as err:
+        print(datetime.now(), "Unable to save artwork paths:", err)
+        return
+    _art_paths_lines = len(_art_paths)
+
+
+# Append a path resolution (or, with download_path None, the removal
+# of one) to the journal.  The caller must hold _art_cache_lock.
+def _art_paths_append(image_path, download_path):
+    global _art_paths_lines
+    if _art_paths_file is None:
+        return
+
+    try:
+        with open(_art_paths_file, "a") as f:
+            f.write(json.dumps([image_path, download_path]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError as err:
+        print(datetime.now(), "Unable to save artwork paths:", err)
+        return
+
+    _art_paths_lines += 1
+    if _art_paths_lines > 2 * ART_PATHS_MAX:
+        _art_paths_compact()
+
+
+# Translate a path from Kodi into a URL for retrieving it, via
+# Files.PrepareDownload.  Resolutions are remembered (on disk too, if
+# the artwork cache is enabled).  Returns None upon failure.
+def resolve_art_url(image_path):
+    with _art_cache_lock:
+        download_path = _art_paths.pop(image_path, None)
+        if download_path is not None:
+            _art_paths[image_path] = download_path
+            return base_url + "/" + download_path
+
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "Files.PrepareDownload",
+        "params": {"path": image_path},
+        "id": 5,
+    }
+    response = kodi_rpc(payload)
+    if DEBUG_ART:
+        print("PrepareDownload Response: ", json.dumps(response))  # debug info
+
+    try:
+        download_path = response['result']['details']['path']
+    except BaseException:
+        return None
 
-        if DEBUG_ART:
-            print("Airplay new_image_time", new_image_time)  # debug info
-
-        if (not prev_image or
-            (new_image_time and new_image_time != _last_image_time)):
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "Files.PrepareDownload",
-                "params": {"path": image_path},
-                "id": "5c",
-            }
-            response = requests.post(
-                rpc_url,
-                data=json.dumps(payload),
-                headers=headers).json()
-            if DEBUG_ART:
-                print("Airplay prepare response: ", json.dumps(response))  # debug info
+    with _art_cache_lock:
+        _art_paths.pop(image_path, None)
+        _art_paths[image_path] = download_path
+        _art_paths_trim()
+        _art_paths_append(image_path, download_path)
+    return base_url + "/" + download_path
 
+
+# Forget a path resolution that no longer works
+def forget_art_url(image_path):
+    with _art_cache_lock:
+        if _art_paths.pop(image_path, None) is not None:
+            _art_paths_append(image_path, None)
+
+
+
+# Artwork Resampling
+# ------------------
+#
+# Decoding a 1000-3000 pixel cover and then resampling it down to a
+# few hundred pixels is among the most expensive things kodi_panel
+# does.  Pillow's thumbnail() can instead ask the JPEG decoder for a
+# reduced-resolution image (scaled by 1/2, 1/4, or 1/8) via draft(),
+# or reduce() other formats by an integer factor, before the final
+# resample.  How close to the target size that first step may go is
+# set by its reducing_gap argument: smaller is faster, larger is
+# closer to a full-quality resample.
+#
+# The resample mode may be given per artwork element (the thumb entry
+# of a layout, or an audio_cover / generic_artwork field) via a
+# "resample" key, defaulting to ART_RESAMPLE:
+#
+#   fast      bilinear, decoded as close to the final size as possible
+#   default   bicubic, decoded to at least twice the final size,
+#             exactly as Pillow's thumbnail() does on its own
+#   quality   Lanczos, decoded to at least three times the final size
+#
+# Run kodi_panel_bench.py to compare the modes on a given cover.
+#
+ART_RESAMPLE = config.settings.get("ART_RESAMPLE", "default")
+
+RESAMPLE_MODES = {
+    "fast"    : (Image.BILINEAR, 1.0),
+    "default" : (Image.BICUBIC,  2.0),
+    "quality" : (Image.LANCZOS,  3.0),
+}
+
+if ART_RESAMPLE not in RESAMPLE_MODES:
+    warnings.warn("Unknown ART_RESAMPLE " + str(ART_RESAMPLE) + ", using default")
+    ART_RESAMPLE = "default"
+
+
+# Reduce artwork in place to fit within thumb_width and thumb_height.
+# Works best if the image has not yet been loaded (i.e., straight from
+# Image.open), so that reduced-resolution decoding remains possible.
+def reduce_artwork(cover, thumb_width, thumb_height, resample="default"):
+    mode, reducing_gap = RESAMPLE_MODES.get(resample, RESAMPLE_MODES["default"])
+    cover.thumbnail((thumb_width, thumb_height), mode, reducing_gap=reducing_gap)
+
+
+
+# Local Artwork
+# -------------
+#
+# With Kodi on the same machine, Files.PrepareDownload plus an HTTP
+# download over loopback just has Kodi's web server read the file
+# from disk on our behalf, competing with video decoding.  With
+# LOCAL_ARTWORK enabled, cover paths are instead resolved to files and
+# read directly:
+#
+#   - image:// paths are looked up in Kodi's texture cache (first via
+#     its Textures13.db database, then via the CRC-based name Kodi
+#     gives files within userdata/Thumbnails), or else used directly
+#     if the wrapped path is itself a local file,
+#   - special:// paths are mapped into KODI_HOME, and
+#   - absolute paths are used as-is.
+#
+# Anything not found that way is still retrieved via HTTP.
+#
+LOCAL_ARTWORK = config.settings.get("LOCAL_ARTWORK", True)
+KODI_HOME = config.settings.get("KODI_HOME", "/storage/.kodi/")
+
+_KODI_SPECIAL = {
+    "home"          : "",
+    "masterprofile" : "userdata",
+    "profile"       : "userdata",
+    "userdata"      : "userdata",
+    "database"      : "userdata/Database",
+    "thumbnails"    : "userdata/Thumbnails",
+    "temp"          : "temp",
+}
+
+
+# Kodi's texture cache names files using a CRC-32 (MPEG-2 variant:
+# not reflected, no final XOR) of the lowercased URL
+def kodi_crc32(text):
+    crc = 0xFFFFFFFF
+    for byte in text.lower().encode("utf-8"):
+        crc ^= byte << 24
+        for i in range(8):
+            if crc & 0x80000000:
+                crc = ((crc << 1) ^ 0x04C11DB7) & 0xFFFFFFFF
+            else:
+                crc = (crc << 1) & 0xFFFFFFFF
+    return crc
+
+
+# Find the texture cache file for an (unwrapped) image URL
+def texture_cache_path(url):
+    thumbnails = os.path.join(KODI_HOME, "userdata", "Thumbnails")
+    database = os.path.join(KODI_HOME, "userdata", "Database", "Textures13.db")
+
+    if os.path.isfile(database):
+        try:
+            db = sqlite3.connect("file:" + database + "?mode=ro", uri=True, timeout=1)
             try:
-                image_url = base_url + "/" + \
-                    response['result']['details']['path']
-                if DEBUG_ART: print("Airplay image_url : ", image_url) # debug info
-            except BaseException:
-                pass
+                row = db.execute("SELECT cachedurl FROM texture WHERE url = ?",
+                                 (url,)).fetchone()
+            finally:
+                db.close()
+            if row and os.path.isfile(os.path.join(thumbnails, row[0])):
+                return os.path.join(thumbnails, row[0])
+        except sqlite3.Error:
+            pass
 
-            r = requests.get(image_url, stream=True)
-            # check that the retrieval was successful before proceeding
-            if r.status_code == 200:
-                try:
-                    r.raw.decode_content = True
-                    cover = Image.open(io.BytesIO(r.content))
-                    image_set = True
-                    resize_needed = True
-                    _last_image_time = new_image_time
-                    _image_default = False
-                except BaseException:
-                    cover = Image.open(_default_audio_thumb)
-                    prev_image = cover
-                    image_set = True
-                    resize_needed = True
-                    _image_default = True
-        else:
-            image_set = True
-
-    # We proceed through this code when running local to Kodi.
-    if not image_set:
-        if _airtunes_re.match(cover_path):
-            airplay_thumb = "/storage/.kodi/temp/" + \
-                _airtunes_re.match(cover_path).group(1)
-            if os.path.isfile(airplay_thumb):
-                _image_default = False
-                resize_needed = True
+    crc = "%08x" % kodi_crc32(url)
+    for extension in (".jpg", ".png"):
+        filename = os.path.join(thumbnails, crc[0], crc + extension)
+        if os.path.isfile(filename):
+            return filename
+    return None
+
+
+# Resolve a cover path from Kodi to a local file, or None
+def local_art_path(cover_path):
+    path = cover_path
+    if path.startswith("image://"):
+        # Transformed images (e.g., with size options) aren't cached
+        # under the plain URL, so leave those to Kodi
+        if not path.endswith("/"):
+            return None
+        path = unquote(path[len("image://"):-1])
+        cached = texture_cache_path(path)
+        if cached:
+            return cached
+
+    if path.startswith("special://"):
+        special, _, rest = path[len("special://"):].partition("/")
+        if special not in _KODI_SPECIAL:
+            return None
+        path = os.path.join(KODI_HOME, _KODI_SPECIAL[special], rest)
+
+    if (path.startswith("/") and os.path.isfile(path)):
+        return path
+    return None
+
+
+
+# Artwork Memory Cache
+# --------------------
+#
+# Retrieved (and resized) artwork is held in memory, so that the same
+# cover at the same size can be returned without any network
+# activity.  A plain lru_cache counts entries, though, and a 480x480
+# cover occupies over twenty times the memory of a 100 pixel thumb.
+# This cache instead evicts least-recently used images once their
+# total size exceeds ART_MEMORY_MB megabytes.  The most recent entry
+# is always retained, even if by itself it exceeds the budget.
+# Entries are keyed by cover path and size, so they remain valid
+# across layout changes.
+#
+# Identical requests arriving while a retrieval is already underway
+# (from the background artwork thread, the next-track prefetch, or a
+# touch-triggered update) wait for and share its result, rather than
+# retrieving the same artwork again.
+#
+# Hits, misses, evictions, collapsed duplicate requests, and resident
+# bytes are tallied; artwork_cache_summary() prints them (done
+# periodically in main() when DEBUG_ART is set).
+#
+ART_MEMORY_MB = config.settings.get("ART_MEMORY_MB", 12)
+
+# Bytes per pixel within Pillow's own image storage
+_MODE_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2}
+
+
+# Approximate memory occupied by an image (or None)
+def image_bytes(image):
+    if image is None:
+        return 0
+    return image.width * image.height * _MODE_BYTES.get(image.mode, 4)
+
+
+class ArtworkCache:
+    def __init__(self, budget, keep_newest=False):
+        self.budget = budget
+        self.keep_newest = keep_newest   # retain an entry over budget
+        self.lock = threading.Lock()
+        self.entries = {}         # key -> (image, bytes), oldest first
+        self.inflight = {}        # key -> _ArtworkFlight
+        self.resident = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.collapsed = 0
+
+    # Look up an entry, returning (found, image)
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.entries[key] = entry
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, image, size=None):
+        with self.lock:
+            self._store(key, image, size)
+
+    # The caller must hold self.lock
+    def _store(self, key, image, size=None):
+        if size is None:
+            size = image_bytes(image)
+        if (size > self.budget and not self.keep_newest):
+            return
+        old = self.entries.pop(key, None)
+        if old:
+            self.resident -= old[1]
+        self.entries[key] = (image, size)
+        self.resident += size
+        while (self.resident > self.budget and len(self.entries) > 1):
+            oldest = next(iter(self.entries))
+            self.resident -= self.entries.pop(oldest)[1]
+            self.evictions += 1
+
+    # Call fetch() to produce the entry for key, unless that is already
+    # underway on another thread, in which case its result is shared.
+    # The entry is stored and the flight ended together, so a caller
+    # always finds one or the other.
+    def fetch_once(self, key, fetch):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                # finished since the caller's get() missed
+                self.entries[key] = entry
+                self.collapsed += 1
+                return entry[0]
+
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _ArtworkFlight()
             else:
-                _image_default = True
-                resize_needed = True
+                self.collapsed += 1
 
-    # is resizing needed?
-    if (image_set and resize_needed):
-        if (enlarge and (image.size[0] < thumb_width or
-                         image.size[1] < thumb_height)):
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.image
 
-            # Figure out which dimension is the constraint
-            # for maintenance of the aspect ratio
-            width_enlarge  = thumb_width / float(image.size[0])
-            height_enlarge = thumb_height / float(image.size[1])
-            ratio = min( width_enlarge, height_enlarge )
+        try:
+            flight.image = fetch()
+        except BaseException as err:
+            flight.error = err
+            with self.lock:
+                del self.inflight[key]
+            flight.done.set()
+            raise
 
-            new_width  = int( image.size[0] * ratio )
-            new_height = int( image.size[1] * ratio )
-            cover = cover.resize((new_width, new_height))
+        with self.lock:
+            self._store(key, flight.image)
+            del self.inflight[key]
+        flight.done.set()
+        return flight.image
 
-        else:
-            # reduce while maintaining aspect ratio, which should
-            # be precisely what thumbnail accomplishes
-            cover.thumbnail((thumb_width, thumb_height))
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries
 
-        prev_image = cover
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self.resident -= entry[1]
 
-    if image_set:
-        return prev_image
-    else:
-        return None
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.resident = 0
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "resident": self.resident,
+                    "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "collapsed": self.collapsed}
+
+
+class _ArtworkFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.image = None
+        self.error = None
+
+
+_artwork_cache = ArtworkCache(ART_MEMORY_MB * 1024 * 1024, keep_newest=True)
+
+
+def artwork_cache_summary():
+    stats = _artwork_cache.stats()
+    print(datetime.now(), "Artwork cache: %d entries, %d KiB of %d KiB, "
+          "%d hits, %d misses, %d evictions, %d duplicates collapsed" %
+          (stats["entries"], stats["resident"] // 1024,
+           _artwork_cache.budget // 1024,
+           stats["hits"], stats["misses"], stats["evictions"],
+           stats["collapsed"]))
+
+
+def _artwork_key(cover_path, thumb_width, thumb_height, use_defaults, enlarge, resample):
+    return (cover_path, thumb_width, thumb_height, bool(use_defaults),
+            bool(enlarge), resample)
 
 
 
@@ -1351,9 +2866,9 @@ def get_airplay_art(cover_path, prev_image, thumb_width, thumb_height, enlarge=F
 #
 # Originally, this function replied upon a prev_image argument being
 # passed in, together with storing the incoming cover_path string to a
-# _last_image_path global.  Switching the function to be memoized via
-# the lru_cached decorator removed the need for both of those
-# practices.
+# _last_image_path global.  Switching the function to be memoized
+# (first via the lru_cached decorator, now via the Artwork Memory
+# Cache above) removed the need for both of those practices.
 #
 # With AirPlay artwork now handled separately, the caching should
 # permit for returning the same cover_path image, at a given size,
@@ -1369,12 +2884,24 @@ def get_airplay_art(cover_path, prev_image, thumb_width, thumb_height, enlarge=F
 #                 retrieving artwork
 #  enlarge       boolean indicating if artwork should be enlarged
 #                 if smaller than the specified width and height
-#
-@lru_cache(maxsize=18)
-def get_artwork(cover_path, thumb_width, thumb_height, use_defaults=False, enlarge=False):
+#  resample      name of resampling mode used for reduction
+#                 (see Artwork Resampling)
+#
+def get_artwork(cover_path, thumb_width, thumb_height, use_defaults=False, enlarge=False,
+                resample="default"):
+    key = _artwork_key(cover_path, thumb_width, thumb_height,
+                       use_defaults, enlarge, resample)
+    found, cover = _artwork_cache.get(key)
+    if not found:
+        cover = _artwork_cache.fetch_once(key, lambda: _fetch_artwork(*key))
+    return cover
+
+
+def _fetch_artwork(cover_path, thumb_width, thumb_height, use_defaults, enlarge, resample):
     image_url = None
     image_set = False
     resize_needed = False
+    cache_wanted = False
 
     cover = None  # used for retrieved artwork, original size
 
@@ -1386,39 +2913,45 @@ def get_artwork(cover_path, thumb_width, thumb_height, use_defaults=False, enlar
         image_path = cover_path
         if DEBUG_ART: print("image_path : ", image_path) # debug info
 
-        if (image_path.startswith("http://") or
-            image_path.startswith("https://")):
-            image_url = image_path
-        else:
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "Files.PrepareDownload",
-                "params": {"path": image_path},
-                "id": 5,
-            }
-            response = requests.post(
-                rpc_url, data=json.dumps(payload), headers=headers).json()
-            if DEBUG_ART:
-                print("PrepareDownload Response: ", json.dumps(response))  # debug info
+        cover = art_cache_load(cover_path, thumb_width, thumb_height, enlarge, resample)
+        if cover is not None:
+            return cover
 
-            try:
-                image_url = base_url + "/" + \
-                    response['result']['details']['path']
-                if DEBUG_ART: print("image_url : ", image_url) # debug info
-            except BaseException:
-                pass
+        local_file = None
+        if (_local_kodi and LOCAL_ARTWORK):
+            local_file = local_art_path(image_path)
+            if DEBUG_ART: print("local_file : ", local_file) # debug info
 
-        r = requests.get(image_url, stream=True)
-        # check that the retrieval was successful before proceeding
-        if r.status_code == 200:
+        if local_file:
             try:
-                r.raw.decode_content = True
-                cover = Image.open(io.BytesIO(r.content))
+                cover = Image.open(local_file)
                 image_set = True
                 resize_needed = True
             except BaseException:
                 image_set = False
 
+        if not image_set:
+            if (image_path.startswith("http://") or
+                image_path.startswith("https://")):
+                image_url = image_path
+            else:
+                image_url = resolve_art_url(image_path)
+                if DEBUG_ART: print("image_url : ", image_url) # debug info
+
+        if image_url:
+            r = kodi_get(image_url)
+            # check that the retrieval was successful before proceeding
+            if r.status_code == 200:
+                try:
+                    cover = Image.open(io.BytesIO(r.content))
+                    image_set = True
+                    resize_needed = True
+                    cache_wanted = True
+                except BaseException:
+                    image_set = False
+            elif image_url != image_path:
+                forget_art_url(image_path)
+
     # use default images if we haven't retrieved anything
     if (not image_set and use_defaults):
         default_path = ""
@@ -1450,12 +2983,106 @@ def get_artwork(cover_path, thumb_width, thumb_height, use_defaults=False, enlar
         else:
             # reduce while maintaining aspect ratio, which should
             # be precisely what thumbnail accomplishes
-            cover.thumbnail((thumb_width, thumb_height))
+            reduce_artwork(cover, thumb_width, thumb_height, resample)
+
+    if cache_wanted:
+        art_cache_store(cover, cover_path, thumb_width, thumb_height, enlarge, resample)
 
     return cover
 
 
 
+# Background Artwork Retrieval
+# ----------------------------
+#
+# A slow thumbnail server or a large fanart file can hold up
+# get_artwork() for a long time, and with it the whole display (clock
+# and progress bar included).  With ASYNC_ARTWORK enabled, artwork
+# that must be retrieved from Kodi is instead fetched by a background
+# thread.  Until it arrives, the default thumbnail (or nothing, if
+# defaults aren't wanted) gets drawn in its place.  Once it does
+# arrive (in the Artwork Memory Cache), the static frame is discarded
+# so that update_display() rebuilds it with the real artwork.
+#
+# Since the artwork is delivered via that cache, ART_MEMORY_MB must
+# leave room for the few images a screen uses at once.  Smaller
+# settings are raised to ASYNC_ART_MIN_MB, lest each arrival evict
+# another and trigger its retrieval all over again.
+#
+ASYNC_ARTWORK = config.settings.get("ASYNC_ARTWORK", False)
+ASYNC_ART_MIN_MB = 4
+
+if (ASYNC_ARTWORK and ART_MEMORY_MB < ASYNC_ART_MIN_MB):
+    warnings.warn("ASYNC_ARTWORK requires ART_MEMORY_MB of at least " +
+                  str(ASYNC_ART_MIN_MB) + ", using that")
+    ART_MEMORY_MB = ASYNC_ART_MIN_MB
+    _artwork_cache.budget = ART_MEMORY_MB * 1024 * 1024
+
+_art_pending = set()
+_art_pending_lock = threading.Lock()
+_art_arrived = threading.Event()
+
+
+# Determine if a cover path requires retrieval from Kodi
+def needs_retrieval(cover_path):
+    return (cover_path != '' and
+            (not cover_path.startswith('DefaultVideoCover')) and
+            (not cover_path.startswith('DefaultAlbumCover')) and
+            (not _airtunes_re.match(cover_path)))
+
+
+def _artwork_worker(key, placeholder):
+    cover_path, thumb_width, thumb_height, use_defaults, enlarge, resample = key
+    try:
+        _artwork_cache.fetch_once(key, lambda: _fetch_artwork(*key))
+    except BaseException:
+        print(datetime.now(), "Artwork retrieval failed:", sys.exc_info()[0])
+        # Show the placeholder, rather than retrying on every update
+        artwork = None
+        if use_defaults:
+            artwork = get_artwork(placeholder, thumb_width, thumb_height,
+                                  use_defaults=True, enlarge=enlarge,
+                                  resample=resample)
+        _artwork_cache.put(key, artwork)
+
+    with _art_pending_lock:
+        _art_pending.discard(key)
+    if DEBUG_ART: print(datetime.now(), "artwork arrived : ", cover_path)
+    _art_arrived.set()
+    _wake_event.set()
+
+
+# Drop-in replacement for get_artwork(), used when rendering.  With
+# ASYNC_ARTWORK enabled, returns the artwork if already retrieved and
+# otherwise starts its retrieval, returning the default thumbnail
+# named by placeholder (see get_artwork) in the meantime.
+def load_artwork(cover_path, thumb_width, thumb_height, use_defaults=False, enlarge=False,
+                 resample="default", placeholder="DefaultAlbumCover"):
+    if not (ASYNC_ARTWORK and needs_retrieval(cover_path)):
+        return get_artwork(cover_path, thumb_width, thumb_height,
+                           use_defaults=use_defaults, enlarge=enlarge,
+                           resample=resample)
+
+    key = _artwork_key(cover_path, thumb_width, thumb_height,
+                       use_defaults, enlarge, resample)
+    found, artwork = _artwork_cache.get(key)
+    if found:
+        return artwork
+
+    with _art_pending_lock:
+        if key not in _art_pending:
+            _art_pending.add(key)
+            threading.Thread(target=_artwork_worker, args=(key, placeholder),
+                             daemon=True).start()
+
+    if use_defaults:
+        return get_artwork(placeholder, thumb_width, thumb_height,
+                           use_defaults=True, enlarge=enlarge,
+                           resample=resample)
+    return None
+
+
+
 # Paste retrieve artwork into the Pillow Image being rendered,
 # positioning it based upon the based dictionary (from either a
 # layout's "thumb" entry or one entry from its fields array) and the
@@ -1481,6 +3108,9 @@ def get_artwork(cover_path, thumb_width, thumb_height, use_defaults=False, enlar
 #               at the position that it would have been located
 #               if it was full-size
 #
+#  resample   Name of resampling mode used when reducing the
+#               artwork ("fast", "default", or "quality")
+#
 # Note that the caller is responsible for handling any display_if or
 # display_ifnot conditional.  Those are NOT examined here.
 #
@@ -1538,24 +3168,60 @@ def paste_artwork(image, artwork, field_dict):
 
 _InfoLabel_re = re.compile(r'\{(\w*\.?\w*)\}')
 
+# Originally, every call searched the string for InfoLabel names and
+# then called str.replace() once per name.  Since the same handful of
+# format strings get used on every update, each is now compiled, upon
+# first use, into a FormatTemplate: the literal text between
+# substitutions, plus the name and (if any) STRING_CB callback for
+# each substitution.  Interpolation then amounts to filling in the
+# substituted values and a single join.
+#
+# As before, an InfoLabel present in kodi_info takes precedence over
+# a callback of the same name, and names matching neither are
+# replaced by an empty string.  Templates are discarded by
+# clear_compiled_layouts(), so that changes to STRING_CB are seen.
+
+class FormatTemplate:
+    __slots__ = ("parts", "subs")
+
+    def __init__(self, format_str):
+        # re.split() alternates literal text and captured names
+        self.parts = _InfoLabel_re.split(format_str)
+        self.subs = tuple((i, self.parts[i], STRING_CB.get(self.parts[i]))
+                          for i in range(1, len(self.parts), 2))
+
+    def names(self):
+        return [name for i, name, string_cb in self.subs]
+
+    def render(self, kodi_info, screen_mode=None, layout_name=""):
+        parts = list(self.parts)
+        for i, name, string_cb in self.subs:
+            if name in kodi_info:
+                # lookup substitution using InfoLabels
+                parts[i] = kodi_info[name]
+            elif string_cb:
+                # lookup substitution from string-manipulation callbacks
+                parts[i] = string_cb(kodi_info, screen_mode, layout_name)
+            else:
+                parts[i] = ""
+        return "".join(parts)
+
+
+_format_templates = {}
+
+
+def compile_format(format_str):
+    template = _format_templates.get(format_str)
+    if template is None:
+        # guard against scripts interpolating ever-changing strings
+        if len(_format_templates) >= 256:
+            _format_templates.clear()
+        template = _format_templates[format_str] = FormatTemplate(format_str)
+    return template
+
+
 def format_InfoLabels(orig_str, kodi_info, screen_mode=None, layout_name=""):
-    matches = set(_InfoLabel_re.findall(orig_str))
-    new_str = orig_str
-    for field in matches:
-        if field in kodi_info.keys():
-            # lookup substitution using InfoLabels
-            new_str = new_str.replace('{' + field + '}', kodi_info[field])
-        elif field in STRING_CB.keys():
-            # lookup substitution from string-manipulation callbacks
-            new_str = new_str.replace('{' + field + '}',
-                                      STRING_CB[field](
-                                          kodi_info,
-                                          screen_mode,
-                                          layout_name
-                                      ))
-        else:
-            new_str = new_str.replace('{' + field + '}', '')
-    return new_str
+    return compile_format(orig_str).render(kodi_info, screen_mode, layout_name)
 
 
 
@@ -1638,6 +3304,519 @@ def check_display_expr(field_dict, info, screen_mode, layout_name):
         return (result_str != test_str)
 
 
+# Text Sprites
+# ------------
+#
+# Every draw.text() call has FreeType lay out and rasterize the
+# string anew, even though most strings on screen (labels, titles,
+# artist names, and the like) are the same ones drawn during the
+# previous update.  Instead, the rasterized coverage mask for each
+# (string, font) pair is retained and, on later use, drawn with
+# draw.bitmap() in the desired fill color.  That is the same blending
+# draw.text() performs, so the results are pixel-identical.  The
+# fill is applied at that point, so a single mask serves any color.
+# Wrapped text is handled line by line, with the wrapping itself
+# already memoized by text_wrap().
+#
+# Masks are held in a least-recently used cache bounded by
+# TEXT_SPRITE_MB megabytes (one byte per pixel), with 0 disabling
+# sprites altogether.  Multi-line strings, fractional positions, and
+# images without antialiased text fall back to draw.text().
+#
+# Hits, misses, and memory use get printed along with the
+# DEBUG_FRAMES summary.
+#
+TEXT_SPRITE_MB = config.settings.get("TEXT_SPRITE_MB", 2)
+
+_text_sprites = ArtworkCache(TEXT_SPRITE_MB * 1024 * 1024)
+
+
+def text_sprite_summary():
+    stats = _text_sprites.stats()
+    print(datetime.now(), "Text sprite cache: %d entries, %d KiB of %d KiB, "
+          "%d hits, %d misses, %d evictions" %
+          (stats["entries"], stats["resident"] // 1024,
+           _text_sprites.budget // 1024,
+           stats["hits"], stats["misses"], stats["evictions"]))
+
+
+# Coverage mask for text drawn at the origin, along with its offset,
+# or None if the text has no visible pixels
+def text_sprite(text, font):
+    key = (text, font)
+    found, sprite = _text_sprites.get(key)
+    if not found:
+        x0, y0, x1, y1 = font.getbbox(text)
+        if (x1 > x0 and y1 > y0):
+            mask = Image.new("L", (x1 - x0, y1 - y0))
+            ImageDraw.Draw(mask).text((-x0, -y0), text, fill=255, font=font)
+            sprite = ((x0, y0), mask)
+            _text_sprites.put(key, sprite, image_bytes(mask))
+        else:
+            _text_sprites.put(key, None, 0)
+    return sprite
+
+
+# Drop-in replacement for draw.text(xy, text, fill=fill, font=font)
+def draw_text(draw, xy, text, fill, font):
+    if (not _text_sprites.budget or font is None or
+            draw.fontmode != "L" or "\n" in text or
+            type(xy[0]) is not int or type(xy[1]) is not int):
+        draw.text(xy, text, fill=fill, font=font)
+        return
+
+    sprite = text_sprite(text, font)
+    if sprite is not None:
+        (x0, y0), mask = sprite
+        draw.bitmap((xy[0] + x0, xy[1] + y0), mask, fill=fill)
+
+
+# Glyph Atlas
+# -----------
+#
+# Fields that change every second, like MusicPlayer.Time or the
+# status screen's clock, produce a new string on nearly every update,
+# so caching whole strings (see Text Sprites) doesn't help them.
+# They are, however, made up of just a handful of characters.  A
+# GlyphAtlas rasterizes each of GLYPH_CHARS up front (and any other
+# character upon first use) once per font, then builds a string by
+# drawing those glyphs at the pen positions given by the font's
+# advances and kerning (see Font Metrics).  Glyphs that overlap are
+# first combined into a single mask, taking the larger coverage just
+# as FreeType's own rendering into one bitmap does.  The result
+# matches draw.text() exactly.
+#
+# Atlas rendering is selected for a field by setting
+#
+#   glyphs = true
+#
+# in its layout entry.  It is honored by plain text fields and by the
+# time_hrmin element.  Fonts using Pillow's Raqm layout, which may
+# shape text in ways a glyph-at-a-time approach can't reproduce, are
+# drawn via draw_text() instead.
+#
+
+GLYPH_CHARS = "0123456789:. -APM"
+
+
+class GlyphAtlas:
+    def __init__(self, font):
+        self.font = font
+        self.metrics = font_metrics(font)
+        self.glyphs = {}   # character -> (x0, y0, mask), or None if blank
+        for ch in GLYPH_CHARS:
+            self._rasterize(ch)
+
+    def _rasterize(self, ch):
+        x0, y0, x1, y1 = self.font.getbbox(ch)
+        if (x1 > x0 and y1 > y0):
+            mask = Image.new("L", (x1 - x0, y1 - y0))
+            ImageDraw.Draw(mask).text((-x0, -y0), ch, fill=255, font=self.font)
+            glyph = (x0, y0, mask)
+        else:
+            glyph = None
+        self.glyphs[ch] = glyph
+        return glyph
+
+    # Each visible glyph of text, as (x, y, mask) relative to the
+    # drawing position, along with whether any of them overlap
+    def layout(self, text):
+        pens = self.metrics.prefix_widths(text)
+        placed = []
+        overlap = False
+        right = None
+        for i, ch in enumerate(text):
+            glyph = self.glyphs.get(ch, False)
+            if glyph is False:
+                glyph = self._rasterize(ch)
+            if glyph is None:
+                continue
+            x = round(pens[i]) + glyph[0]
+            if (right is not None and x < right):
+                overlap = True
+            right = x + glyph[2].width
+            placed.append((x, glyph[1], glyph[2]))
+        return placed, overlap
+
+    # Bounding box of the pixels draw() would touch, or None
+    def bounds(self, xy, text):
+        box = None
+        for x, y, mask in self.layout(text)[0]:
+            box = union_box(box, (xy[0] + x, xy[1] + y,
+                                  xy[0] + x + mask.width, xy[1] + y + mask.height))
+        return box
+
+    def draw(self, draw, xy, text, fill):
+        placed, overlap = self.layout(text)
+        if not placed:
+            return
+        if type(fill) is str:
+            fill = ImageColor.getcolor(fill, draw.mode)
+
+        if not overlap:
+            for x, y, mask in placed:
+                draw.bitmap((xy[0] + x, xy[1] + y), mask, fill=fill)
+            return
+
+        box = None
+        for x, y, mask in placed:
+            box = union_box(box, (x, y, x + mask.width, y + mask.height))
+        combined = Image.new("L", (box[2] - box[0], box[3] - box[1]))
+        for x, y, mask in placed:
+            dest = (x - box[0], y - box[1],
+                    x - box[0] + mask.width, y - box[1] + mask.height)
+            combined.paste(ImageChops.lighter(combined.crop(dest), mask), dest)
+        draw.bitmap((xy[0] + box[0], xy[1] + box[1]), combined, fill=fill)
+
+
+_glyph_atlases = {}
+
+
+def glyph_atlas(font):
+    atlas = _glyph_atlases.get(font)
+    if atlas is None:
+        atlas = _glyph_atlases[font] = GlyphAtlas(font)
+    return atlas
+
+
+# Can text be drawn at xy using a GlyphAtlas?
+def glyphs_usable(draw, xy, text, font):
+    return (getattr(font, "layout_engine", None) == ImageFont.Layout.BASIC and
+            draw.fontmode == "L" and "\n" not in text and
+            type(xy[0]) is int and type(xy[1]) is int)
+
+
+# Bounding box of text drawn at xy by draw_glyphs() (if glyphs is
+# set) or draw_text()
+def text_bounds(draw, xy, text, font, glyphs=False):
+    if (glyphs and glyphs_usable(draw, xy, text, font)):
+        return glyph_atlas(font).bounds(xy, text)
+    return draw.textbbox(xy, text, font=font)
+
+
+# Like draw_text(), but using the font's GlyphAtlas when possible
+def draw_glyphs(draw, xy, text, fill, font):
+    if glyphs_usable(draw, xy, text, font):
+        glyph_atlas(font).draw(draw, xy, text, fill)
+    else:
+        draw_text(draw, xy, text, fill, font)
+
+
+# Compiled Layouts
+# ----------------
+#
+# fixup_layouts() resolves fonts and colors once, but walking the
+# layout dictionaries directly still means re-deciding, for every
+# field on every update, whether it is static or dynamic, which of
+# its many optional keys are present, and which callback (if any) it
+# names.  Instead, each layout is compiled into lists of field
+# objects, pre-split into static and dynamic sets, each with its
+# callback, display conditional, exclusions, and rendering method
+# already determined.  The progress bar's geometry is worked out
+# ahead of time as well.
+#
+# Compilation happens upon a layout's first use, so that callbacks
+# installed by user scripts after this module is imported are seen.
+# Element callbacks still receive the field's original dictionary.
+# If a layout or the ELEMENT_CB / STRING_CB tables get modified after
+# that first use, call clear_compiled_layouts().
+#
+
+# A display_if or display_ifnot conditional (see check_display_expr)
+class DisplayCondition:
+    __slots__ = ("name", "test_str", "check_equal", "string_cb")
+
+    def __init__(self, name, test_str, check_equal):
+        self.name = name
+        self.test_str = test_str
+        self.check_equal = check_equal
+        self.string_cb = STRING_CB.get(name)
+
+    # Build from a field dictionary, returning None if the field is
+    # always to be displayed
+    @staticmethod
+    def compile(field_dict):
+        if type(field_dict.get("display_if")) == list:
+            name, test_str = field_dict["display_if"][:2]
+            check_equal = True
+        elif type(field_dict.get("display_ifnot")) == list:
+            name, test_str = field_dict["display_ifnot"][:2]
+            check_equal = False
+        else:
+            return None
+        if (not name and not test_str):
+            return None
+        return DisplayCondition(name, test_str, check_equal)
+
+    def check(self, info, screen_mode, layout_name):
+        if self.name in info:
+            result_str = info[self.name]
+        elif self.string_cb:
+            result_str = self.string_cb(info, screen_mode, layout_name)
+        else:
+            # Cannot find name, don't display element!
+            return False
+
+        if DEBUG_FIELDS:
+            print("  display_expr: result of '" + self.name + "' was '" + result_str + "'")
+
+        return (result_str == self.test_str) == self.check_equal
+
+
+# One entry from a layout's fields array
+class CompiledField:
+    __slots__ = ("spec", "name", "cond", "callback", "format_str",
+                 "template", "prefix", "suffix", "affix", "exclude",
+                 "label", "label_xy", "lfill", "lfont",
+                 "xy", "fill", "font", "max_width", "max_lines",
+                 "labels", "draws", "value", "render", "text_bounds")
+
+    def __init__(self, field_dict):
+        self.spec = field_dict
+        self.name = field_dict["name"]
+        self.cond = DisplayCondition.compile(field_dict)
+
+        self.prefix = field_dict.get("prefix", "")
+        self.suffix = field_dict.get("suffix", "")
+        self.affix = ("prefix" in field_dict or "suffix" in field_dict)
+        self.format_str = field_dict.get("format_str")
+        self.template = compile_format(self.format_str) if self.format_str else None
+
+        # How the string to display is determined
+        self.labels = element_labels(field_dict)
+        self.draws = (self.name in ELEMENT_CB)
+        if self.draws:
+            self.callback = ELEMENT_CB[self.name]
+            self.value = self._value_element
+        elif self.name in STRING_CB:
+            self.callback = STRING_CB[self.name]
+            self.value = self._value_string_cb
+        else:
+            self.callback = None
+            self.value = self._value_label
+
+        exclude = field_dict.get("exclude")
+        if type(exclude) == str:
+            self.exclude = (exclude,)
+        elif type(exclude) == list:
+            self.exclude = tuple(exclude)
+        else:
+            self.exclude = None
+
+        self.label = field_dict.get("label")
+        self.label_xy = (field_dict.get("lposx"), field_dict.get("lposy"))
+        self.lfill = field_dict.get("lfill")
+        self.lfont = field_dict.get("lfont")
+
+        # How that string gets drawn
+        self.xy = (field_dict.get("posx"), field_dict.get("posy"))
+        self.fill = field_dict.get("fill")
+        self.font = field_dict.get("font")
+        if "wrap" in field_dict:
+            self.max_width = field_dict.get("max_width")
+            self.max_lines = field_dict.get("max_lines")
+            self.render = self._render_wrap
+            self.text_bounds = self._wrap_bounds
+        elif "trunc" in field_dict:
+            self.max_width = _frame_size[0] - field_dict.get("posx", 0)
+            self.max_lines = 1
+            self.render = self._render_wrap
+            self.text_bounds = self._wrap_bounds
+        elif field_dict.get("glyphs", False):
+            self.max_width = None
+            self.max_lines = None
+            self.render = self._render_glyphs
+            self.text_bounds = self._glyph_bounds
+        else:
+            self.max_width = None
+            self.max_lines = None
+            self.render = self._render_text
+            self.text_bounds = self._text_bounds
+
+    # Determine the string to display, or None if the field should
+    # not be shown.  Element callbacks may draw into image as a side
+    # effect.
+    def resolve(self, image, draw, info, screen_mode, layout_name):
+        # Check for any display conditional expression
+        if (self.cond and
+                not self.cond.check(info, screen_mode, layout_name)):
+            return None
+
+        display_string = self.value(image, draw, info, screen_mode, layout_name)
+
+        # check for any exclusions
+        if (not display_string or
+                (self.exclude and display_string in self.exclude)):
+            return None
+        return display_string
+
+    # Draw a string obtained from resolve(), along with any label
+    def draw_string(self, draw, display_string):
+        if self.label is not None:
+            draw_text(draw, self.label_xy, self.label,
+                      fill=self.lfill, font=self.lfont)
+        self.render(draw, display_string)
+
+    # Bounding box of what draw_string() would render
+    def bounds(self, draw, display_string):
+        box = self.text_bounds(draw, display_string)
+        if self.label is not None:
+            box = union_box(box, draw.textbbox(self.label_xy, self.label,
+                                               font=self.lfont))
+        return box
+
+    def _text_bounds(self, draw, display_string):
+        return draw.textbbox(self.xy, display_string, font=self.font)
+
+    def _glyph_bounds(self, draw, display_string):
+        return text_bounds(draw, self.xy, display_string, self.font, glyphs=True)
+
+    def _wrap_bounds(self, draw, display_string):
+        line_array = text_wrap(display_string, self.font,
+                               self.max_width, self.max_lines)
+        line_height = font_metrics(self.font).line_height
+        (posx, posy) = self.xy
+        box = None
+        for line in line_array:
+            box = union_box(box, draw.textbbox((posx, posy), line, font=self.font))
+            posy = posy + line_height
+        return box
+
+    def _value_element(self, image, draw, info, screen_mode, layout_name):
+        display_string = self.callback(image, draw, info, self.spec,
+                                       screen_mode, layout_name)
+        # still permit prefix and suffix options
+        if (display_string and self.affix):
+            display_string = self.prefix + display_string + self.suffix
+        return display_string
+
+    def _value_string_cb(self, image, draw, info, screen_mode, layout_name):
+        display_string = self.callback(info, screen_mode, layout_name)
+        # still permit prefix and suffix options
+        if (display_string and self.affix):
+            display_string = self.prefix + display_string + self.suffix
+        return display_string
+
+    def _value_label(self, image, draw, info, screen_mode, layout_name):
+        # use format_str or prefix/suffix approach, in that order
+        if self.format_str:
+            return self.template.render(info, screen_mode, layout_name)
+        value = info.get(self.name)
+        if (value is None or (value == "" and self.format_str is None)):
+            return None
+        return self.prefix + value + self.suffix
+
+    def _render_text(self, draw, display_string):
+        draw_text(draw, self.xy, display_string, fill=self.fill, font=self.font)
+
+    def _render_glyphs(self, draw, display_string):
+        draw_glyphs(draw, self.xy, display_string, fill=self.fill, font=self.font)
+
+    def _render_wrap(self, draw, display_string):
+        render_text_wrap(draw, self.xy, display_string,
+                         max_width=self.max_width,
+                         max_lines=self.max_lines,
+                         fill=self.fill,
+                         font=self.font)
+
+
+# A layout's progress bar (see progress_bar)
+class CompiledProgress:
+    __slots__ = ("cond", "x", "y", "h", "short_len", "long_len",
+                 "bgcolor", "color", "vertical", "circle",
+                 "circle_fill", "circle_outline")
+
+    def __init__(self, field_dict):
+        self.cond = DisplayCondition.compile(field_dict)
+        self.bgcolor = field_dict["color_bg"]
+        self.color = field_dict["color_fg"]
+        self.x = field_dict["posx"]
+        self.y = field_dict["posy"]
+        self.h = field_dict["height"]
+
+        # Long dimension, for use_long_len False and True
+        if field_dict.get("vertical", False) and "len" in field_dict:
+            self.short_len = self.long_len = field_dict["len"]
+        else:
+            if "short_len" in field_dict:
+                self.short_len = field_dict["short_len"]
+            else:
+                self.short_len = field_dict.get("len", 0)
+            self.long_len = field_dict.get("long_len", self.short_len)
+
+        self.vertical = ("vertical" in field_dict)
+        self.circle = int(field_dict["circle"]) if "circle" in field_dict else None
+        self.circle_fill = field_dict.get("circle_fill", "black")
+        self.circle_outline = field_dict.get("circle_outline", "white")
+
+    # Bounding box of anything render() might draw
+    def bounds(self, use_long_len=False):
+        w = self.long_len if use_long_len else self.short_len
+        if w == 0:
+            return None
+        r = self.circle or 0
+        return (math.floor(self.x - r), math.floor(self.y - r),
+                math.ceil(self.x + w + r) + 1, math.ceil(self.y + self.h + r) + 1)
+
+    def render(self, draw, progress, use_long_len=False):
+        x, y, h = self.x, self.y, self.h
+        w = self.long_len if use_long_len else self.short_len
+        if w == 0:
+            return
+
+        # Background rectangle
+        draw.rectangle((x, y, x + w, y + h), fill=self.bgcolor)
+
+        if progress <= 0:
+            progress = 0.001
+        if progress > 1:
+            progress = 1
+
+        # Foreground rectangle (progress indictor)
+        r = self.circle
+        if self.vertical:
+            dh = h * progress
+            draw.rectangle((x, y + h - dh, x + w, y + h), fill=self.color)
+            if r is not None:
+                draw.ellipse((x+(0.5*w)-r, y+h-dh-r, x+(0.5*w)+r, y+h-dh+r),
+                             fill=self.circle_fill, outline=self.circle_outline)
+        else:
+            dw = w * progress
+            draw.rectangle((x, y, x + dw, y + h), fill=self.color)
+            if r is not None:
+                draw.ellipse((x+dw-r, y+(0.5*h)-r, x+dw+r, y+(0.5*h)+r),
+                             fill=self.circle_fill, outline=self.circle_outline)
+
+
+class CompiledLayout:
+    __slots__ = ("all_fields", "static_fields", "dynamic_fields", "prog")
+
+    def __init__(self, layout):
+        self.all_fields = [CompiledField(field_dict)
+                           for field_dict in layout.get("fields", [])]
+        self.static_fields = [field for field in self.all_fields
+                              if not field.spec.get("dynamic", 0)]
+        self.dynamic_fields = [field for field in self.all_fields
+                               if field.spec.get("dynamic", 0)]
+        self.prog = CompiledProgress(layout["prog"]) if "prog" in layout else None
+
+
+_compiled_layouts = {}    # id(layout) -> (layout, CompiledLayout)
+
+
+def compile_layout(layout):
+    entry = _compiled_layouts.get(id(layout))
+    if (entry is None or entry[0] is not layout):
+        entry = (layout, CompiledLayout(layout))
+        _compiled_layouts[id(layout)] = entry
+    return entry[1]
+
+
+def clear_compiled_layouts():
+    _compiled_layouts.clear()
+    _format_templates.clear()
+
+
 # Render all layout fields, stepping through the fields array from the
 # layout dictionary that is passed in.
 #
@@ -1661,156 +3840,351 @@ def check_display_expr(field_dict, info, screen_mode, layout_name):
 #
 def draw_fields(image, draw, layout, info,
                 screen_mode=None, layout_name="", dynamic=False):
+    compiled = compile_layout(layout)
+
+    # Select the fields desired for this invocation, based on static
+    # vs dynamic.  Just show everything for a STATUS screen or a SLIDE
+    # screen.
+    if (screen_mode == ScreenMode.STATUS or
+        screen_mode == ScreenMode.SLIDE):
+        field_list = compiled.all_fields
+    elif dynamic:
+        field_list = compiled.dynamic_fields
+    else:
+        field_list = compiled.static_fields
 
-    # Pull out the layout's array of fields
-    field_list = layout.get("fields", [])
-    for field_dict in field_list:
-        display_string = None
-
+    for field in field_list:
         if DEBUG_FIELDS:
-            print("Examining field: ", field_dict)
+            print("Examining field: ", field.spec)
 
-        # Skip over the fields that aren't desired for this
-        # invocation, based on static vs dynamic.
-        #
-        # Just show everything for a STATUS screen or
-        # a SLIDE screen.
+        # if there is nothing to display, move on to the next field,
+        # otherwise render it.
+        display_string = field.resolve(image, draw, info, screen_mode, layout_name)
+        if display_string:
+            field.draw_string(draw, display_string)
 
-        if (screen_mode == ScreenMode.STATUS or
-            screen_mode == ScreenMode.SLIDE):
-            pass
-        else:
-            if dynamic:
-                if not field_dict.get("dynamic", 0):
-                    continue
-            else:
-                if field_dict.get("dynamic", 0):
-                    continue
 
-        # Check for any display conditional expression
-        if ("display_if" in field_dict or
-            "display_ifnot" in field_dict):
-            if (not check_display_expr(field_dict,
-                                       info,
-                                       screen_mode,
-                                       layout_name)):
-                # skip this field
-                continue
 
-        # Check for any defined callback functions.  If an entry
-        # exists in the lookup table, invoke the specified function
-        # with all of the arguments discussed in earlier comments.
-
-        if field_dict["name"] in ELEMENT_CB:
-            display_string = ELEMENT_CB[field_dict["name"]](
-                image,             # Image instance
-                draw,              # ImageDraw instance
-                info,              # Kodo InfoLabel response
-                field_dict,        # layout details for field
-                screen_mode,       # screen mode, as enum
-                layout_name        # layout name, as string
-            )
-            # print("Invoked element CB for", field_dict["name"],"; received back '", display_string, "'")
-
-            # still permit prefix and suffix options
-            if (display_string != "" and
-                ("prefix" in field_dict or "suffix" in field_dict)):
-                display_string = (field_dict.get("prefix", "") +
-                                  display_string +
-                                  field_dict.get("suffix", ""))
-
-        elif field_dict["name"] in STRING_CB:
-            display_string = STRING_CB[field_dict["name"]](
-                info,              # Kodo InfoLabel response
-                screen_mode,       # screen mode, as enum
-                layout_name        # layout name, as string
-            )
-            # print("Invoked string CB for", field_dict["name"],"; received back '", display_string, "'")
 
-            # still permit prefix and suffix options
-            if (display_string != "" and
-                ("prefix" in field_dict or "suffix" in field_dict)):
-                display_string = (field_dict.get("prefix", "") +
-                                  display_string +
-                                  field_dict.get("suffix", ""))
+# Dirty-Region Rendering
+# ----------------------
+#
+# Between track changes, the only things that differ from one update
+# to the next are the dynamic fields and the progress bar -- usually
+# just a few digits of the elapsed time.  Rather than pasting the
+# entire static image and redrawing every dynamic element each time,
+# DamageTracker remembers what each dynamic element last showed and
+# where.  Only elements whose content has changed get restored from
+# the static image and redrawn, along with any other dynamic elements
+# that overlap them.
+#
+# The rectangles touched by the most recent frame are available from
+# frame_damage(), with None meaning that the whole frame should be
+# considered changed.
+#
+# Text fields are compared by the string they display.  Element
+# callbacks can draw anywhere, so they are compared using the
+# InfoLabels they examine (see CALLBACK_LABELS) and the extent of
+# their drawing is found from CALLBACK_BOUNDS or, failing that, by
+# running them against a copy of the static image.  Callbacks with no
+# CALLBACK_LABELS entry are redrawn on every update.  If such a
+# callback has no CALLBACK_BOUNDS entry either, finding its extent
+# each time would cost more than a full redraw, so layouts containing
+# one are simply redrawn in full.
+#
+# The tracker assumes nothing else draws into the frame between its
+# updates.  Any code that does so must call _dirty.invalidate().
+#
+# Setting DIRTY_RENDER to false reverts to full redraws.
+#
 
-        else:
-            if (# name corresponds to a non-empty InfoLabel -OR-
-                (field_dict["name"] in info and info[field_dict["name"]] != "") or
-                # entry has a format_str specified for use
-                ("format_str" in field_dict)):
-
-                # use format_str or prefix/suffic approach, in that order
-                if field_dict.get("format_str", ""):
-                    display_string = format_InfoLabels(
-                        field_dict["format_str"], info, screen_mode, layout_name)
-                elif field_dict["name"] in info:
-                    display_string = (field_dict.get("prefix", "") +
-                                      info[field_dict["name"]] +
-                                      field_dict.get("suffix", ""))
-
-
-        # if the string to display is empty, move on to the next field,
-        # otherwise render it.
-        if (not display_string or display_string == ""):
-            continue
+DIRTY_RENDER = config.settings.get("DIRTY_RENDER", True)
 
-        # check for any exclusions
-        if "exclude" in field_dict:
-            if type(field_dict["exclude"]) == str:
-                if display_string == field_dict["exclude"]:
-                    continue
-            elif type(field_dict["exclude"]) == list:
-                if display_string in field_dict["exclude"]:
-                    continue
 
-        # render any label first
-        if "label" in field_dict:
-            draw.text((field_dict["lposx"], field_dict["lposy"]),
-                      field_dict["label"],
-                      fill=field_dict["lfill"], font=field_dict["lfont"])
-
-        if "wrap" in field_dict.keys():
-            render_text_wrap(draw,
-                             (field_dict["posx"], field_dict["posy"]),
-                             display_string,
-                             max_width=field_dict["max_width"],
-                             max_lines=field_dict["max_lines"],
-                             fill=field_dict["fill"],
-                             font=field_dict["font"])
-        elif "trunc" in field_dict.keys():
-            render_text_wrap(draw,
-                             (field_dict["posx"], field_dict["posy"]),
-                             display_string,
-                             max_width=_frame_size[0] -
-                             field_dict["posx"],
-                             max_lines=1,
-                             fill=field_dict["fill"],
-                             font=field_dict["font"])
+# Smallest rectangle containing both a and b, either of which may be None
+def union_box(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def boxes_overlap(a, b):
+    return (a[0] < b[2] and b[0] < a[2] and
+            a[1] < b[3] and b[1] < a[3])
+
+
+# Grow a bounding box by a pixel (to be safe with antialiasing) and
+# clip it to the frame, returning None if nothing remains
+def _clip_box(box):
+    if box is None:
+        return None
+    box = (max(0, box[0] - 1), max(0, box[1] - 1),
+           min(_frame_size[0], box[2] + 1), min(_frame_size[1], box[3] + 1))
+    if (box[0] >= box[2] or box[1] >= box[3]):
+        return None
+    return box
+
+
+class DamageTracker:
+    def __init__(self):
+        self.static = None     # static image the frame was built upon
+        self.layout = None
+        self.state = []        # (content key, bounding box) per dynamic element
+        self.damage = None     # rectangles changed by the last frame
+        self.rendered = False  # set once render() has been called this frame
+
+    def invalidate(self):
+        self.static = None
+        self.layout = None
+        self.state = []
+        self.damage = None
+
+    # Called when a frame is left exactly as the last one, so that
+    # the state carries over to the next update
+    def unchanged(self):
+        self.rendered = True
+        self.damage = []
+
+    # Called once a frame is complete.  If render() wasn't used, the
+    # frame must have been drawn some other way.
+    def end_frame(self):
+        if not self.rendered:
+            self.invalidate()
+        self.rendered = False
+
+    # Content key for each dynamic field, plus the progress bar.  Text
+    # fields are resolved here, with their strings used as keys.
+    def _keys(self, image, draw, compiled, info, screen_mode, layout_name,
+              prog, use_long_len):
+        keys = []
+        for field in compiled.dynamic_fields:
+            if not field.draws:
+                keys.append(field.resolve(image, draw, info, screen_mode, layout_name))
+            elif field.labels is None:
+                keys.append(object())   # never equal, always redrawn
+            else:
+                keys.append(tuple(info.get(label) for label in field.labels))
+
+        bar = compiled.prog
+        if bar is not None:
+            if (prog == -1 or
+                    (bar.cond and not bar.cond.check(info, screen_mode, layout_name))):
+                keys.append(None)
+            else:
+                keys.append((use_long_len, prog))
+        return keys
+
+    # Bounding box for element i, given its new key
+    def _bounds(self, i, key, draw, compiled, info, screen_mode, layout_name):
+        if key is None:
+            return None
+        if i == len(compiled.dynamic_fields):
+            return _clip_box(compiled.prog.bounds(key[0]))
+
+        field = compiled.dynamic_fields[i]
+        if not field.draws:
+            return _clip_box(field.bounds(draw, key))
+        if field.callback in CALLBACK_BOUNDS:
+            return _clip_box(CALLBACK_BOUNDS[field.callback](
+                self.static, draw, info, field.spec, screen_mode, layout_name))
+
+        scratch = self.static.copy()
+        self._draw(i, key, scratch, ImageDraw.Draw(scratch),
+                   compiled, info, screen_mode, layout_name)
+        return _clip_box(ImageChops.difference(scratch, self.static).getbbox())
+
+    def _draw(self, i, key, image, draw, compiled, info, screen_mode, layout_name):
+        if key is None:
+            return
+        if i == len(compiled.dynamic_fields):
+            compiled.prog.render(draw, key[1], use_long_len=key[0])
+            return
+
+        field = compiled.dynamic_fields[i]
+        if field.draws:
+            display_string = field.resolve(image, draw, info, screen_mode, layout_name)
+            if display_string:
+                field.draw_string(draw, display_string)
         else:
-            draw.text((field_dict["posx"], field_dict["posy"]),
-                      display_string,
-                      fill=field_dict["fill"],
-                      font=field_dict["font"])
+            field.draw_string(draw, key)
+
+    # Can every dynamic element be tracked without a full-frame
+    # comparison on each update?
+    def _trackable(self, compiled):
+        return not any(field.draws and field.labels is None and
+                       field.callback not in CALLBACK_BOUNDS
+                       for field in compiled.dynamic_fields)
+
+    # Bring image up to date for the dynamic portion of a layout,
+    # drawn on top of the static image
+    def render(self, image, draw, static, layout, info,
+               screen_mode, layout_name, prog, use_long_len=False):
+        compiled = compile_layout(layout)
+        keys = self._keys(image, draw, compiled, info, screen_mode, layout_name,
+                          prog, use_long_len)
+        self.rendered = True
+
+        if not self._trackable(compiled):
+            # Redraw everything, as without DIRTY_RENDER
+            self.invalidate()
+            image.paste(static, (0, 0))
+            for i, key in enumerate(keys):
+                self._draw(i, key, image, draw, compiled, info, screen_mode, layout_name)
+            return
+
+        if (static is not self.static or layout is not self.layout):
+            # Start over from the static image
+            self.static = static
+            self.layout = layout
+            self.damage = None
+            image.paste(static, (0, 0))
+            self.state = []
+            for i, key in enumerate(keys):
+                self._draw(i, key, image, draw, compiled, info, screen_mode, layout_name)
+                self.state.append((key, self._bounds(i, key, draw, compiled, info,
+                                                     screen_mode, layout_name)))
+            return
+
+        # Old and new extents of anything that has changed
+        damage = []
+        redraw = set()
+        for i, key in enumerate(keys):
+            old_key, old_box = self.state[i]
+            if key == old_key:
+                continue
+            new_box = self._bounds(i, key, draw, compiled, info, screen_mode, layout_name)
+            self.state[i] = (key, new_box)
+            redraw.add(i)
+            if old_box:
+                damage.append(old_box)
+            if (new_box and new_box != old_box):
+                damage.append(new_box)
+
+        # Unchanged elements overlapping that damage get redrawn too,
+        # which may in turn damage still more
+        growing = bool(damage)
+        while growing:
+            growing = False
+            for i, (key, box) in enumerate(self.state):
+                if (i not in redraw and box and
+                        any(boxes_overlap(box, rect) for rect in damage)):
+                    redraw.add(i)
+                    damage.append(box)
+                    growing = True
+
+        for rect in damage:
+            image.paste(static.crop(rect), rect[:2])
+        for i in sorted(redraw):
+            self._draw(i, keys[i], image, draw, compiled, info, screen_mode, layout_name)
+        self.damage = damage
+
+
+_dirty = DamageTracker()
+
+
+# Rectangles changed by the most recent update, or None if the entire
+# frame must be assumed to have changed
+def frame_damage():
+    return _dirty.damage
+
+
+# Start the frame over with a blank slate
+def blank_frame():
+    draw.rectangle(
+        [(0, 0), (_frame_size[0], _frame_size[1])], 'black', 'black')
+    _dirty.invalidate()
+
+
+# Render dynamic portion of an audio or video screen on top of the
+# static image, redrawing only what has changed if DIRTY_RENDER is
+# enabled
+def render_dynamic(image, draw, static, layout, info, prog, screen_mode, layout_name):
+    if screen_mode == ScreenMode.AUDIO:
+        use_long_len = (info['MusicPlayer.Time'].count(":") == 2)
+    else:
+        use_long_len = (info['VideoPlayer.Time'].count(":") == 2)
+
+    if DIRTY_RENDER:
+        _dirty.render(image, draw, static, layout, info,
+                      screen_mode, layout_name, prog, use_long_len)
+        return
 
+    image.paste(static, (0, 0))
+    if screen_mode == ScreenMode.AUDIO:
+        audio_screen_dynamic(image, draw, layout, info, prog)
+    else:
+        video_screen_dynamic(image, draw, layout, info, prog)
 
 
 
-# Idle status screen (often shown upon a screen press)
+
+# Status and Slideshow Layers
+# ---------------------------
 #
-#   First two arguments are Pillow Image and ImageDraw objects.
-#   Third argument is a dictionary loaded from Kodi with info fields.
+# Originally, the status and slideshow screens were redrawn in their
+# entirety on every update, with status_screen() even re-opening and
+# resizing the Kodi logo (and any background image) each time.  They
+# now get the same static/dynamic split as the audio and video
+# screens.  The background, logo, and every field not marked dynamic
+# are drawn into a static layer, with just the dynamic fields (the
+# clock, uptime, and the like) drawn on top of it, via Dirty-Region
+# Rendering when enabled.
 #
-# Unlike audio_screen_static() and video_screen_static(), this
-# function is NOT expected to create a completely new Image object.
-# So, the background fill (if any) is handled in a slightly different
-# manner.
+# The few most recent static layers are retained, keyed by the layout
+# and by the content of their static fields: the strings displayed by
+# text fields, and the InfoLabels examined by element callbacks (see
+# CALLBACK_LABELS).  A static element callback lacking a
+# CALLBACK_LABELS entry causes its layer to be rebuilt every time.
+# They are kept apart from the Static Frame Cache, so that status
+# screen churn can't evict the audio and video static images.
+#
+# Layouts without any dynamic fields, as all of them were before,
+# would need a new layer whenever anything on-screen changes, clock
+# included.  They are instead drawn directly on every update, just as
+# they always were.  Setting STATIC_LAYERS to false does the same for
+# every layout.
 #
-def status_screen(image, draw, kodi_status):
-    layout = STATUS_LAYOUT
 
-    # Draw any user-specified rectangle or load background
-    # image for layout
+STATIC_LAYERS = config.settings.get("STATIC_LAYERS", True)
+
+_layer_cache = ArtworkCache(4 * image_bytes(image))
+
+
+# Kodi logo for the status screen, sized as requested
+@lru_cache(maxsize=4)
+def kodi_logo(size, enlarge):
+    kodi_icon = Image.open(_kodi_thumb)
+
+    if (enlarge and
+        (kodi_icon.size[0] < size or
+         kodi_icon.size[1] < size)):
+        width_enlarge  = size / float(kodi_icon.size[0])
+        height_enlarge = size / float(kodi_icon.size[1])
+        ratio = min( width_enlarge, height_enlarge )
+
+        new_width  = int( kodi_icon.size[0] * ratio )
+        new_height = int( kodi_icon.size[1] * ratio )
+        kodi_icon = kodi_icon.resize((new_width, new_height))
+
+    else:
+        kodi_icon.thumbnail((size, size))
+
+    kodi_icon.load()
+    return kodi_icon
+
+
+@lru_cache(maxsize=4)
+def background_image(path):
+    bg_image = Image.open(path)
+    bg_image.load()
+    return bg_image
+
+
+# Draw any user-specified rectangle or load background image for a
+# status or slideshow layout, on top of whatever image already holds
+def draw_background(image, draw, layout):
     if "background" in layout:
         if ("rectangle" in layout["background"] and
             layout["background"]["rectangle"]):
@@ -1825,8 +4199,7 @@ def status_screen(image, draw, kodi_status):
               os.path.isfile(layout["background"]["image"]) and
               os.access(layout["background"]["image"], os.R_OK)):
             # assume that image is properly sized for the display
-            bg_image = Image.open(layout["background"]["image"])
-            image.paste(bg_image, (0,0))
+            image.paste(background_image(layout["background"]["image"]), (0,0))
 
         elif ("fill" in layout["background"]):
             draw.rectangle(
@@ -1836,29 +4209,97 @@ def status_screen(image, draw, kodi_status):
                 width   = 1
             )
 
-    # Kodi logo, if desired
+
+def draw_kodi_logo(image, layout):
     if "thumb" in layout.keys():
         thumb_dict = layout["thumb"]
-        kodi_icon = Image.open(_kodi_thumb)
+        image.paste(
+            kodi_logo(thumb_dict["size"], thumb_dict.get("enlarge", False)),
+            (thumb_dict["posx"],
+             thumb_dict["posy"]))
 
-        if (thumb_dict.get("enlarge", False) and
-            (kodi_icon.size[0] < thumb_dict["size"] or
-             kodi_icon.size[1] < thumb_dict["size"])):
-            width_enlarge  = thumb_dict["size"] / float(kodi_icon.size[0])
-            height_enlarge = thumb_dict["size"] / float(kodi_icon.size[1])
-            ratio = min( width_enlarge, height_enlarge )
 
-            new_width  = int( kodi_icon.size[0] * ratio )
-            new_height = int( kodi_icon.size[1] * ratio )
-            kodi_icon = kodi_icon.resize((new_width, new_height))
+# Whether a status or slideshow layout gets drawn via a static layer
+def use_layers(layout):
+    return STATIC_LAYERS and bool(compile_layout(layout).dynamic_fields)
+
 
+# Cache key for a layout's static layer, or None if it can't be cached
+def layer_key(image, draw, compiled, info, screen_mode, layout_name):
+    key = [screen_mode.name, layout_name, id(compiled)]
+    for field in compiled.static_fields:
+        if not field.draws:
+            key.append(field.resolve(image, draw, info, screen_mode, layout_name))
+        elif field.labels is None:
+            return None
         else:
-            kodi_icon.thumbnail((thumb_dict["size"], thumb_dict["size"]))
+            key.append(tuple(info.get(label) for label in field.labels))
+    return tuple(key)
 
-        image.paste(
-            kodi_icon,
-            (thumb_dict["posx"],
-             thumb_dict["posy"]))
+
+# Render a status or slideshow layout as a static layer plus its
+# dynamic fields
+def render_layers(image, draw, layout, info, screen_mode, layout_name):
+    compiled = compile_layout(layout)
+    key = layer_key(image, draw, compiled, info, screen_mode, layout_name)
+    if key is None:
+        found, layer = False, None
+    else:
+        found, layer = _layer_cache.get(key)
+
+    if not found:
+        layer = Image.new('RGB', (_frame_size), 'black')
+        layer_draw = ImageDraw.Draw(layer)
+        draw_background(layer, layer_draw, layout)
+        if screen_mode == ScreenMode.STATUS:
+            draw_kodi_logo(layer, layout)
+        for field in compiled.static_fields:
+            display_string = field.resolve(layer, layer_draw, info,
+                                           screen_mode, layout_name)
+            if display_string:
+                field.draw_string(layer_draw, display_string)
+        if key is not None:
+            _layer_cache.put(key, layer)
+
+    if DIRTY_RENDER:
+        _dirty.render(image, draw, layer, layout, info,
+                      screen_mode, layout_name, -1)
+        return
+
+    image.paste(layer, (0, 0))
+    for field in compiled.dynamic_fields:
+        display_string = field.resolve(image, draw, info, screen_mode, layout_name)
+        if display_string:
+            field.draw_string(draw, display_string)
+
+
+# Idle status screen (often shown upon a screen press)
+#
+#   First two arguments are Pillow Image and ImageDraw objects.
+#   Third argument is a dictionary loaded from Kodi with info fields.
+#
+# Unlike audio_screen_static() and video_screen_static(), this
+# function is NOT expected to create a completely new Image object.
+# So, the background fill (if any) is handled in a slightly different
+# manner.  Layouts with dynamic fields instead get built upon a static
+# layer (see Status and Slideshow Layers), which covers the entire
+# frame.
+#
+def status_screen(image, draw, kodi_status):
+    layout = STATUS_LAYOUT
+
+    if use_layers(layout):
+        render_layers(image, draw, layout, kodi_status,
+                      ScreenMode.STATUS, "STATUS_LAYOUT")
+        return
+
+    # Draw any user-specified rectangle or load background
+    # image for layout, over a blank slate
+    blank_frame()
+    draw_background(image, draw, layout)
+
+    # Kodi logo, if desired
+    draw_kodi_logo(image, layout)
 
     # go through all layout fields, if any
     if "fields" not in layout.keys():
@@ -1874,8 +4315,10 @@ def status_screen(image, draw, kodi_status):
 #
 #  First argument is the layout dictionary to use
 #  Second argument is a dictionary loaded from Kodi with relevant InfoLabels
+#  Third argument is the layout's name, as a string, which need not be
+#   the one currently shown (see Layout Pre-rendering)
 #
-def audio_screen_static(layout, info):
+def audio_screen_static(layout, info, layout_name):
     global _last_thumb
 
     # Create new Image and ImageDraw objects
@@ -1930,7 +4373,7 @@ def audio_screen_static(layout, info):
             show_thumb = check_display_expr(thumb_dict,
                                             info,
                                             ScreenMode.AUDIO,
-                                            audio_dmode.name)
+                                            layout_name)
 
     # Conditionally retrieve cover image from Kodi, if it exists and
     # needs a refresh.  AirPlay cover art must be handled specially.
@@ -1939,12 +4382,14 @@ def audio_screen_static(layout, info):
         if _airtunes_re.match(info['MusicPlayer.Cover']):
             _last_thumb = get_airplay_art(info['MusicPlayer.Cover'], _last_thumb,
                                           thumb_dict["size"], thumb_dict["size"],
-                                          enlarge=thumb_dict.get("enlarge", False))
+                                          enlarge=thumb_dict.get("enlarge", False),
+                                          resample=thumb_dict.get("resample", ART_RESAMPLE))
         else:
-            _last_thumb = get_artwork(info['MusicPlayer.Cover'],
-                                      thumb_dict["size"], thumb_dict["size"],
-                                      use_defaults=True,
-                                      enlarge=thumb_dict.get("enlarge", False))
+            _last_thumb = load_artwork(info['MusicPlayer.Cover'],
+                                       thumb_dict["size"], thumb_dict["size"],
+                                       use_defaults=True,
+                                       enlarge=thumb_dict.get("enlarge", False),
+                                       resample=thumb_dict.get("resample", ART_RESAMPLE))
 
 
         if _last_thumb:
@@ -1955,7 +4400,7 @@ def audio_screen_static(layout, info):
     # All static layout fields
     draw_fields(image, draw,
                 layout, info,
-                ScreenMode.AUDIO, audio_dmode.name,
+                ScreenMode.AUDIO, layout_name,
                 dynamic=0)
 
     # Return new image
@@ -1978,30 +4423,18 @@ def audio_screen_dynamic(image, draw, layout, info, prog):
                 dynamic=1)
 
     # Progress bar, if present and should be displayed
-    show_prog = False
-    prog_dict = {}
+    prog_bar = compile_layout(layout).prog
+    if (prog == -1 or prog_bar is None):
+        return
 
-    if (prog == -1 or "prog" not in layout.keys()):
-        show_prog = False
-    else:
-        show_prog = True
-        prog_dict = layout["prog"]
+    # If the field has a display conditional (display_cond)
+    # defined, let's test that to decide if we should proceed.
+    if (prog_bar.cond and
+            not prog_bar.cond.check(info, ScreenMode.AUDIO, audio_dmode.name)):
+        return
 
-        # If the field has a display conditional (display_cond)
-        # defined, let's test that to decide if we should proceed.
-        if ("display_if" in prog_dict or
-            "display_ifnot" in prog_dict):
-            show_prog = check_display_expr(prog_dict,
-                                           info,
-                                           ScreenMode.AUDIO,
-                                           audio_dmode.name)
-
-
-    if show_prog:
-        progress_bar(
-            draw, prog_dict, prog,
-            use_long_len = (info['MusicPlayer.Time'].count(":") == 2)
-        )
+    prog_bar.render(draw, prog,
+                    use_long_len = (info['MusicPlayer.Time'].count(":") == 2))
 
 
 
@@ -2028,6 +4461,356 @@ def audio_select_default(info):
 #     kodi_display_panel.AUDIO_SELECT_FUNC = my_selection_func
 #
 AUDIO_SELECT_FUNC = audio_select_default
+CALLBACK_LABELS[audio_select_default] = []
+
+
+# Next-Track Prefetch
+# -------------------
+#
+# At a track change, audio_screens() must normally retrieve and resize
+# the new cover art and lay out all of the static text before the
+# first frame for the new track can be shown.  With PREFETCH_NEXT
+# enabled, a background thread instead looks up the next entry in
+# Kodi's playlist shortly after each track starts, retrieving (and
+# thereby caching) its artwork.  The static frame for that entry then
+# gets rendered on the main thread during a later update, leaving just
+# a swap for when the track actually changes.
+#
+# Playlist.GetItems does not return InfoLabels, so the labels are
+# predicted from the item's fields.  Labels it cannot supply (codec,
+# sample rate, etc.) are assumed to match the current track, as they
+# usually do within an album.  A prefetched frame is only used if
+# every label its static portion depends upon matches what Kodi
+# reports once the track has started.  Otherwise, the frame is
+# discarded and rendered as usual.  Covers are compared via
+# cover_identity(), since Playlist.GetItems and MusicPlayer.Cover
+# needn't express the same artwork in the same way.
+#
+PREFETCH_NEXT = config.settings.get("PREFETCH_NEXT", False)
+
+_PREFETCH_PROPERTIES = ["title", "album", "artist", "track", "duration",
+                        "genre", "year", "displaycomposer", "thumbnail", "file"]
+
+
+# Labels used by the static portion of an audio layout, or None if
+# that cannot be determined (see Per-Layout InfoLabels)
+@lru_cache(maxsize=16)
+def static_label_request(layout_name):
+    layout = AUDIO_LAYOUT[layout_name]
+    wanted = ["MusicPlayer.Cover"]
+    elements = [field for field in layout.get("fields", [])
+                if not field.get("dynamic", 0)]
+    if "thumb" in layout:
+        elements.append(layout["thumb"])
+    for field_dict in elements:
+        labels = element_labels(field_dict)
+        if labels is None:
+            return None
+        wanted += labels
+    return tuple(dict.fromkeys(wanted))
+
+
+# Canonical form of a cover path.  Playlist.GetItems wraps paths as
+# (URL-encoded) image:// URLs, where MusicPlayer.Cover may give them
+# plain, and Kodi's default cover amounts to having no cover at all.
+def cover_identity(cover_path):
+    if (cover_path == "" or cover_path.startswith("DefaultAlbumCover")):
+        return ""
+    if (cover_path.startswith("image://") and cover_path.endswith("/")):
+        return unquote(cover_path[len("image://"):-1])
+    return cover_path
+
+
+# Predict the audio InfoLabels for a Playlist.GetItems entry, starting
+# from those of the current track
+def predict_audio_labels(item, current_info):
+    duration = item.get("duration", 0)
+    if duration >= 3600:
+        duration_str = "%02d:%02d:%02d" % (duration // 3600,
+                                           (duration // 60) % 60,
+                                           duration % 60)
+    else:
+        duration_str = "%02d:%02d" % (duration // 60, duration % 60)
+
+    track = item.get("track", 0)
+    year = item.get("year", 0)
+    info = dict(current_info)
+    info.update({
+        "Player.Filenameandpath"  : item.get("file", ""),
+        "MusicPlayer.Title"       : item.get("title", "") or item.get("label", ""),
+        "MusicPlayer.Album"       : item.get("album", ""),
+        "MusicPlayer.Artist"      : " / ".join(item.get("artist", [])),
+        "MusicPlayer.Genre"       : " / ".join(item.get("genre", [])),
+        "MusicPlayer.Year"        : str(year) if year else "",
+        "MusicPlayer.TrackNumber" : "%02d" % track if track > 0 else "",
+        "MusicPlayer.Duration"    : duration_str if duration else "",
+        "MusicPlayer.Cover"       : item.get("thumbnail", ""),
+        "MusicPlayer.Property(Role.Composer)" : item.get("displaycomposer", ""),
+        })
+    return info
+
+
+class TrackPrefetcher:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = None       # track the prefetch was started for
+        self.info = None          # predicted labels for the next track
+        self.frames = {}          # layout name -> prefetched static image
+
+    # Begin looking up the track after the one identified by key, whose
+    # InfoLabels are provided, as played by the given player
+    def start(self, key, info, playerid=0):
+        with self.lock:
+            if key == self.current:
+                return
+            self.current = key
+            self.info = None
+            self.frames = {}
+        threading.Thread(target=self._fetch, args=(key, dict(info), playerid),
+                         daemon=True).start()
+
+    def _fetch(self, key, current_info, playerid):
+        try:
+            response = kodi_rpc(rpc_payload("Player.GetProperties",
+                                            {"playerid": playerid,
+                                             "properties": ["playlistid",
+                                                            "position"]}, 6),
+                                "Player.GetProperties")
+            position = response["result"]["position"]
+            if position < 0:
+                return
+            response = kodi_rpc(rpc_payload("Playlist.GetItems",
+                                            {"playlistid": response["result"]["playlistid"],
+                                             "limits": {"start": position + 1,
+                                                        "end": position + 2},
+                                             "properties": _PREFETCH_PROPERTIES}, 7),
+                                "Playlist.GetItems")
+            items = response["result"].get("items", [])
+        except BaseException:
+            if DEBUG_ART: print(datetime.now(), "Prefetch lookup failed:", sys.exc_info()[0])
+            return
+        if not items:
+            return
+
+        info = predict_audio_labels(items[0], current_info)
+        if DEBUG_ART: print(datetime.now(), "Prefetching", info["MusicPlayer.Title"])
+
+        # Retrieve the artwork, for each layout that shows a thumb
+        cover = info["MusicPlayer.Cover"]
+        if not _airtunes_re.match(cover):
+            for layout in AUDIO_LAYOUT.values():
+                if "thumb" in layout:
+                    try:
+                        get_artwork(cover,
+                                    layout["thumb"]["size"], layout["thumb"]["size"],
+                                    use_defaults=True,
+                                    enlarge=layout["thumb"].get("enlarge", False),
+                                    resample=layout["thumb"].get("resample",
+                                                                 ART_RESAMPLE))
+                    except BaseException:
+                        pass
+
+        with self.lock:
+            if key == self.current:
+                self.info = info
+
+    # Render the static frame for the next track, if predicted labels
+    # are available and cover everything the layout needs.  Called
+    # from audio_screens() during ordinary updates.
+    def render(self, layout, layout_name):
+        global _last_thumb
+        with self.lock:
+            info = self.info
+        if (info is None or layout_name in self.frames):
+            return
+
+        labels = static_label_request(layout_name)
+        if (labels is None or _airtunes_re.match(info["MusicPlayer.Cover"]) or
+                any(label not in info for label in labels)):
+            self.frames[layout_name] = None
+            return
+
+        prev_thumb = _last_thumb
+        frame = audio_screen_static(layout, info, layout_name)
+        self.frames[layout_name] = (frame, _last_thumb)
+        _last_thumb = prev_thumb
+
+    # Retrieve the prefetched static frame (and its artwork) matching
+    # the new track's actual labels, or None
+    def take(self, layout_name, info):
+        with self.lock:
+            predicted = self.info
+        prefetched = self.frames.get(layout_name)
+        if (predicted is None or prefetched is None):
+            return None
+        for label in static_label_request(layout_name):
+            if label == "MusicPlayer.Cover":
+                matched = (cover_identity(info.get(label, "")) ==
+                           cover_identity(predicted[label]))
+            else:
+                matched = (info.get(label) == predicted[label])
+            if not matched:
+                if DEBUG_ART: print(datetime.now(), "Prefetch mismatch on", label)
+                return None
+        if DEBUG_ART: print(datetime.now(), "Using prefetched static frame")
+        return prefetched
+
+
+_prefetch = TrackPrefetcher()
+
+
+# Static Frame Cache
+# ------------------
+#
+# Rather than keeping just the static image for whatever is currently
+# shown, the most recently used ones are retained, keyed by layout
+# name and the identity of the item playing.  Cycling through layouts
+# with screen presses, or skipping back to the previous track, then
+# finds its static image already rendered.  The cache is bounded by
+# STATIC_CACHE_MB megabytes (an 800x480 frame is a little over one
+# megabyte), with 0 disabling it.
+#
+# Static images built while background artwork retrieval is still
+# underway contain placeholder artwork, so are not retained.  When
+# artwork arrives (or an AirPlay cover changes), the entry for the
+# current static image is dropped.
+#
+# Hit and miss counts get printed along with the DEBUG_FRAMES summary.
+#
+STATIC_CACHE_MB = config.settings.get("STATIC_CACHE_MB", 8)
+
+_static_cache = ArtworkCache(STATIC_CACHE_MB * 1024 * 1024)
+
+
+def static_cache_summary():
+    stats = _static_cache.stats()
+    print(datetime.now(), "Static frame cache: %d entries, %d KiB of %d KiB, "
+          "%d hits, %d misses, %d evictions" %
+          (stats["entries"], stats["resident"] // 1024,
+           _static_cache.budget // 1024,
+           stats["hits"], stats["misses"], stats["evictions"]))
+    stats = _layer_cache.stats()
+    print(datetime.now(), "Static layer cache: %d entries, "
+          "%d hits, %d misses, %d evictions" %
+          (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]))
+
+
+# Retain a newly-rendered static image, along with the thumbnail
+# that was pasted into it
+def static_cache_store(key, static_image, thumb):
+    with _art_pending_lock:
+        if _art_pending:
+            return
+    _static_cache.put(key, (static_image, thumb), image_bytes(static_image))
+
+
+# Layout Pre-rendering
+# --------------------
+#
+# A screen press advances to the next layout, whose static image
+# would ordinarily be rendered on the following update -- which, with
+# large artwork on an RPi Zero, can be a noticeable wait.  When an
+# update leaves time to spare, main() instead has prerender_layout()
+# build the static image for one of the other layouts for whatever is
+# playing, placing it in the Static Frame Cache.  Layouts are taken
+# in the order that screen presses visit them, and no more are built
+# than the cache can hold alongside the current one.  The InfoLabels
+# for all of the layouts are retrieved from Kodi once per item.
+#
+# Nothing is pre-rendered when layouts are selected automatically
+# (AUDIO_LAYOUT_AUTOSELECT, VIDEO_LAYOUT_AUTOSELECT) or while
+# background artwork retrieval is underway.
+#
+PRERENDER_LAYOUTS = config.settings.get("PRERENDER_LAYOUTS", True)
+
+
+# Identity of the item playing, as used in _static_key
+def audio_item(info):
+    return (info["MusicPlayer.TrackNumber"],
+            info["MusicPlayer.Title"],
+            info["MusicPlayer.Album"],
+            info["MusicPlayer.Duration"])
+
+def video_item(info):
+    return (info["VideoPlayer.Title"],
+            info["VideoPlayer.Episode"],
+            info["VideoPlayer.Duration"])
+
+
+class LayoutPrerenderer:
+    def __init__(self):
+        self.kind = None
+        self.item = None     # identity of the item playing
+        self.info = None     # InfoLabels for all of the kind's layouts
+
+    # Note what audio_screens() or video_screens() is showing
+    def showing(self, kind, item):
+        if (kind != self.kind or item != self.item):
+            self.kind = kind
+            self.item = item
+            self.info = None
+
+    # Render the static image for one more layout, returning True if
+    # there was one to do
+    def step(self):
+        global _last_thumb
+        if (self.item is None or _static_image is None or
+                _static_key[0] != self.kind or _static_key[2:] != self.item):
+            return False
+
+        if self.kind == "audio":
+            if AUDIO_LAYOUT_AUTOSELECT:
+                return False
+            current, layouts, render, identity = (audio_dmode, AUDIO_LAYOUT,
+                                                  audio_screen_static, audio_item)
+        else:
+            if VIDEO_LAYOUT_AUTOSELECT:
+                return False
+            current, layouts, render, identity = (video_dmode, VIDEO_LAYOUT,
+                                                  video_screen_static, video_item)
+
+        with _art_pending_lock:
+            if _art_pending:
+                return False
+
+        # Other layouts, in the order screen presses reach them
+        room = _static_cache.budget // max(image_bytes(_static_image), 1) - 1
+        modes = []
+        mode = current.next()
+        while (mode != current and len(modes) < room):
+            modes.append(mode)
+            mode = mode.next()
+
+        for mode in modes:
+            key = (self.kind, mode.name) + self.item
+            if _static_cache.contains(key):
+                continue
+
+            if self.info is None:
+                response = get_labels(screen_label_request(self.kind, all_layouts=True))
+                info = response.get("result")
+                if (not info or identity(info) != self.item):
+                    self.item = None
+                    return False
+                self.info = info
+
+            prev_thumb = _last_thumb
+            frame = render(layouts[mode.name], self.info, mode.name)
+            static_cache_store(key, frame, _last_thumb)
+            _last_thumb = prev_thumb
+            if DEBUG_FRAMES: print(datetime.now(), "Pre-rendered layout", mode.name)
+            return True
+        return False
+
+
+_prerender = LayoutPrerenderer()
+
+
+# Pre-render one layout (see above), if there is one to do
+def prerender_layout():
+    with _lock:
+        if _kodi_playing:
+            _prerender.step()
 
 
 # Audio info screens (shown when music is playing)
@@ -2062,8 +4845,7 @@ AUDIO_SELECT_FUNC = audio_select_default
 #
 
 def audio_screens(image, draw, info):
-    global _static_image, _static_video
-    global _last_track_num, _last_track_title, _last_track_album, _last_track_time
+    global _static_image, _static_key, _last_thumb
     global audio_dmode
 
     # Permit audio content to drive selected layout
@@ -2080,28 +4862,42 @@ def audio_screens(image, draw, info):
         audio_dmode.name
     )
 
-    if (_static_image and (not _static_video) and
-        info["MusicPlayer.TrackNumber"] == _last_track_num and
-        info["MusicPlayer.Title"] == _last_track_title and
-        info["MusicPlayer.Album"] == _last_track_album and
-            info["MusicPlayer.Duration"] == _last_track_time):
-        pass
+    track_key = audio_item(info)
+    static_key = ("audio", audio_dmode.name) + track_key
+    _prerender.showing("audio", track_key)
+
+    if (_static_image and static_key == _static_key):
+        if _airtunes_re.match(info["MusicPlayer.Cover"]):
+            check_airplay_art(info["MusicPlayer.Cover"])
+        elif PREFETCH_NEXT:
+            _prefetch.render(layout, audio_dmode.name)
     else:
-        _static_image = audio_screen_static(layout, info)
-        _static_video = False
-        _last_track_num = info["MusicPlayer.TrackNumber"]
-        _last_track_title = info["MusicPlayer.Title"]
-        _last_track_album = info["MusicPlayer.Album"]
-        _last_track_time = info["MusicPlayer.Duration"]
+        new_track = (_static_key is None or _static_key[2:] != track_key)
+        found, cached = _static_cache.get(static_key)
+        prefetched = None
+        if (PREFETCH_NEXT and not found):
+            prefetched = _prefetch.take(audio_dmode.name, info)
+        if found:
+            _static_image, _last_thumb = cached
+        elif prefetched:
+            _static_image, _last_thumb = prefetched
+            static_cache_store(static_key, _static_image, _last_thumb)
+        else:
+            _static_image = audio_screen_static(layout, info, audio_dmode.name)
+            static_cache_store(static_key, _static_image, _last_thumb)
+        _static_key = static_key
+        if (PREFETCH_NEXT and new_track):
+            _prefetch.start(track_key, info, _kodi_playerid)
 
     # use _static_image as the starting point
-    image.paste(_static_image, (0, 0))
-    audio_screen_dynamic(image, draw, layout, info, prog)
+    render_dynamic(image, draw, _static_image, layout, info, prog,
+                   ScreenMode.AUDIO, audio_dmode.name)
 
 
 
-# Render the static portion of video screens
-def video_screen_static(layout, info):
+# Render the static portion of video screens, with arguments as for
+# audio_screen_static()
+def video_screen_static(layout, info, layout_name):
     global _last_thumb
 
     # Create new Image and ImageDraw objects
@@ -2156,14 +4952,16 @@ def video_screen_static(layout, info):
             show_thumb = check_display_expr(thumb_dict,
                                             info,
                                             ScreenMode.VIDEO,
-                                            video_dmode.name)
+                                            layout_name)
 
     # Retrieve cover image from Kodi, if it exists and needs a refresh
     if show_thumb:
-        _last_thumb = get_artwork(info['VideoPlayer.Cover'],
-                                  thumb_dict["width"], thumb_dict["height"],
-                                  use_defaults=True,
-                                  enlarge=thumb_dict.get("enlarge", False))
+        _last_thumb = load_artwork(info['VideoPlayer.Cover'],
+                                   thumb_dict["width"], thumb_dict["height"],
+                                   use_defaults=True,
+                                   enlarge=thumb_dict.get("enlarge", False),
+                                   resample=thumb_dict.get("resample", ART_RESAMPLE),
+                                   placeholder="DefaultVideoCover")
         if _last_thumb:
             paste_artwork(image, _last_thumb, thumb_dict)
     else:
@@ -2172,7 +4970,7 @@ def video_screen_static(layout, info):
     # All static layout fields
     draw_fields(image, draw,
                 layout, info,
-                ScreenMode.VIDEO, video_dmode.name,
+                ScreenMode.VIDEO, layout_name,
                 dynamic=0)
 
     # Return new image
@@ -2195,29 +4993,18 @@ def video_screen_dynamic(image, draw, layout, info, prog):
                 dynamic=1)
 
     # Progress bar, if present and should be displayed
-    show_prog = False
-    prog_dict = {}
+    prog_bar = compile_layout(layout).prog
+    if (prog == -1 or prog_bar is None):
+        return
 
-    if (prog == -1 or "prog" not in layout.keys()):
-        show_prog = False
-    else:
-        show_prog = True
-        prog_dict = layout["prog"]
+    # If the field has a display conditional (display_cond)
+    # defined, let's test that to decide if we should proceed.
+    if (prog_bar.cond and
+            not prog_bar.cond.check(info, ScreenMode.VIDEO, video_dmode.name)):
+        return
 
-        # If the field has a display conditional (display_cond)
-        # defined, let's test that to decide if we should proceed.
-        if ("display_if" in prog_dict or
-            "display_ifnot" in prog_dict):
-            show_prog = check_display_expr(prog_dict,
-                                           info,
-                                           ScreenMode.VIDEO,
-                                           video_dmode.name)
-
-    if show_prog:
-        progress_bar(
-            draw, prog_dict, prog,
-            use_long_len = (info['VideoPlayer.Time'].count(":") == 2)
-        )
+    prog_bar.render(draw, prog,
+                    use_long_len = (info['VideoPlayer.Time'].count(":") == 2))
 
 
 
@@ -2279,6 +5066,9 @@ def video_select_default(info):
 #     kodi_display_panel.VIDEO_SELECT_FUNC = my_selection_func
 #
 VIDEO_SELECT_FUNC = video_select_default
+CALLBACK_LABELS[video_select_default] = ["Player.Filenameandpath",
+                                         "VideoPlayer.TVShowTitle",
+                                         "VideoPlayer.OriginalTitle"]
 
 
 # Video info screens (shown when a video is playing)
@@ -2289,8 +5079,7 @@ VIDEO_SELECT_FUNC = video_select_default
 #  See static/dynamic description given for audio_screens()
 #
 def video_screens(image, draw, info):
-    global _static_image, _static_video
-    global _last_video_title, _last_video_episode, _last_video_time
+    global _static_image, _static_key, _last_thumb
     global video_dmode
 
     # Permit video content to drive selected layout
@@ -2307,21 +5096,23 @@ def video_screens(image, draw, info):
         video_dmode.name
     )
 
-    if (_static_image and _static_video and
-        info["VideoPlayer.Title"] == _last_video_title and
-        info["VideoPlayer.Episode"] == _last_video_episode and
-            info["VideoPlayer.Duration"] == _last_video_time):
+    static_key = ("video", video_dmode.name) + video_item(info)
+    _prerender.showing("video", video_item(info))
+
+    if (_static_image and static_key == _static_key):
         pass
     else:
-        _static_image = video_screen_static(layout, info)
-        _static_video = True
-        _last_video_title = info["VideoPlayer.Title"]
-        _last_video_episode = info["VideoPlayer.Episode"]
-        _last_video_time = info["VideoPlayer.Duration"]
+        found, cached = _static_cache.get(static_key)
+        if found:
+            _static_image, _last_thumb = cached
+        else:
+            _static_image = video_screen_static(layout, info, video_dmode.name)
+            static_cache_store(static_key, _static_image, _last_thumb)
+        _static_key = static_key
 
     # use _static_image as the starting point
-    image.paste(_static_image, (0, 0))
-    video_screen_dynamic(image, draw, layout, info, prog)
+    render_dynamic(image, draw, _static_image, layout, info, prog,
+                   ScreenMode.VIDEO, video_dmode.name)
 
 
 
@@ -2340,11 +5131,10 @@ SLIDESHOW_SELECT_FUNC = None
 #  First two arguments are Pillow Image and ImageDraw objects.
 #  Third argument is a dictionary loaded from Kodi with relevant info fields.
 #
-# At present, this function is closest in nature to status_screen(),
-# without any distinction between static and dynamic elements.  That
-# assumption is reflect with a conditional in the draw_fields()
-# function.  That conditional will need to be modified if there is a
-# change to this assumption.
+# At present, this function is closest in nature to status_screen().
+# Unless drawn via a static layer, there is no distinction between static
+# and dynamic elements.  That assumption is reflect with a conditional
+# in the draw_fields() function.
 #
 # Custom backgrounds are handled in the same fashion as in
 # status_screen(), since a new Image object isn't expected.
@@ -2359,32 +5149,15 @@ def slideshow_screens(image, draw, info):
     # Retrieve layout details
     layout = SLIDESHOW_LAYOUT[slide_dmode.name]
 
-    # Draw any user-specified rectangle or load background
-    # image for layout
-    if "background" in layout:
-        if ("rectangle" in layout["background"] and
-            layout["background"]["rectangle"]):
-            draw.rectangle(
-                [(0, 0), (_frame_size[0], _frame_size[1])],
-                fill    = layout["background"].get("fill","black"),
-                outline = layout["background"].get("outline","black"),
-                width   = layout["background"].get("width",1)
-            )
-
-        elif ("image" in layout["background"] and
-              os.path.isfile(layout["background"]["image"]) and
-              os.access(layout["background"]["image"], os.R_OK)):
-            # assume that image is properly sized for the display
-            bg_image = Image.open(layout["background"]["image"])
-            image.paste(bg_image, (0,0))
+    if use_layers(layout):
+        render_layers(image, draw, layout, info,
+                      ScreenMode.SLIDE, slide_dmode.name)
+        return
 
-        elif ("fill" in layout["background"]):
-            draw.rectangle(
-                [(0, 0), (_frame_size[0], _frame_size[1])],
-                fill    = layout["background"].get("fill","black"),
-                outline = "black",
-                width   = 1
-            )
+    # Draw any user-specified rectangle or load background
+    # image for layout, over a blank slate
+    blank_frame()
+    draw_background(image, draw, layout)
 
     # go through all layout fields, if any
     if "fields" not in layout.keys():
@@ -2476,6 +5249,37 @@ def screen_off():
     device.backlight(False)
 
 
+# Unchanged Frames
+# ----------------
+#
+# Much of the time -- while paused, idle, or with the screen turned
+# off -- update_display() would send the device exactly what it
+# already shows.  Since the elapsed time stops advancing when Kodi's
+# player speed drops to zero, a paused audio or video screen leaves
+# DamageTracker with nothing to redraw.  The idle status screen and
+# the blank screen shown with the backlight off are identified by
+# the InfoLabels used to draw them, so an identical status screen
+# isn't even rendered.  In all of those cases, nothing is sent to the
+# device.
+#
+# Skipping is never done in DEMO_MODE, since the pygame emulator
+# relies upon display() calls to process its window events.  Set
+# SKIP_UNCHANGED to false to send every frame.
+#
+
+SKIP_UNCHANGED = config.settings.get("SKIP_UNCHANGED", True)
+
+_last_frame_key = None    # identity of the last non-audio/video frame
+_frame_counts = {"sent": 0, "skipped": 0}
+
+
+def frame_stats_summary():
+    total = _frame_counts["sent"] + _frame_counts["skipped"]
+    print(datetime.now(), "Frames: %d sent, %d skipped (%.0f%%)" %
+          (_frame_counts["sent"], _frame_counts["skipped"],
+           100 * _frame_counts["skipped"] / max(total, 1)))
+
+
 # Kodi-polling and image rendering function
 #
 # Determine Kodi state and, if something of interest is playing,
@@ -2485,17 +5289,27 @@ def screen_off():
 # a direct update.
 #
 def update_display(touched=False):
-    global _kodi_playing
+    global BATCH_RPC
+    global _kodi_playing, _kodi_playerid, _split_kind
     global _last_thumb, _static_image
     global _screen_press, _screen_active, _screen_offtime
     global audio_dmode, video_dmode
+    global _last_frame_key
 
     _lock.acquire()
+    frame_key = None
+    skipping = (SKIP_UNCHANGED and not DEMO_MODE)
 
-    # Start with a blank slate, if there's no static image
-    if (not (_kodi_connected and _static_image)):
-        draw.rectangle(
-            [(0, 0), (_frame_size[0], _frame_size[1])], 'black', 'black')
+    # Rebuild the static image if artwork has arrived for it
+    if _art_arrived.is_set():
+        _art_arrived.clear()
+        _static_cache.discard(_static_key)
+        _static_image = None
+
+    # Start with a blank slate, if there's no static image.  Which
+    # screens need that is decided below, since the status and
+    # slideshow screens repaint the entire frame on their own.
+    blank = not (_kodi_connected and _static_image)
 
     # Check if the _screen_active time has expired, unless we're
     # always showing an idle status screen.
@@ -2509,22 +5323,53 @@ def update_display(touched=False):
     # Ask Kodi whether anything is playing...
     #
     #   JSON-RPC calls can only invoke one method per call.  Unless
-    #   we wish to make a "blind" InfoLabels call asking for all
-    #   interesting MusicPlayer and VideoPlayer fields, we must
-    #   make 2 distinct network calls.
+    #   we make a batched call, also asking for all interesting
+    #   MusicPlayer and VideoPlayer fields, we must make 2 distinct
+    #   network calls.
     #
     #   Over wifi on an RPi3 on my home network, each call seems to
-    #   take ~0.025 seconds.
+    #   take ~0.025 seconds.  Reusing the session's connection
+    #   avoids a new TCP handshake for each.
     #
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "Player.GetActivePlayers",
-        "id": 3,
-    }
-    response = requests.post(
-        rpc_url,
-        data=json.dumps(payload),
-        headers=headers).json()
+    #   With the playback clock running, Kodi doesn't get asked at
+    #   all until it is time to resync.
+    #
+    response = None
+    batch_labels = None
+    clock_props = None
+    pressed = (_screen_press or touched)
+    use_clock = USE_PLAYBACK_CLOCK and not pressed
+
+    if (use_clock and not _clock.expired()):
+        response = _clock.players
+        batch_labels = _clock.info()
+        use_clock = False   # nothing new to sync
+
+    elif BATCH_RPC:
+        clock_pid = None
+        if (use_clock and _clock.playerid in _PAYLOAD_CLOCK):
+            clock_pid = _clock.playerid
+        batch = kodi_rpc(batch_payload(batch_label_request(pressed), clock_pid),
+                         "Batch")
+        if type(batch) is list:
+            replies = {reply.get("id"): reply for reply in batch}
+            response = replies.get(3)
+            batch_labels = replies.get("4all", {}).get("result")
+            clock_props = replies.get("5clk")
+        else:
+            print(datetime.now(), "Kodi rejected batched JSON-RPC call.  Using separate calls.")
+            BATCH_RPC = False
+
+    if response is None:
+        response = kodi_rpc(_PAYLOAD_ACTIVE_PLAYERS, "Player.GetActivePlayers")
+
+    players = response
+    if (use_clock and len(response.get('result', []))):
+        active_pid = response['result'][0].get('playerid')
+        if _clock.playerid != active_pid:
+            clock_props = None   # requested for the wrong player
+        if (clock_props is None and active_pid in _PAYLOAD_CLOCK):
+            clock_props = kodi_rpc(_PAYLOAD_CLOCK[active_pid], "Player.GetProperties")
 
     if ('result' not in response.keys() or
         len(response['result']) == 0 or
@@ -2535,14 +5380,8 @@ def update_display(touched=False):
         # Nothing is playing or something for which no display screen
         # is available.
         _kodi_playing = False
-
-        # If there /was/ a static image, let's blank the screen for
-        # the idle status screen.  This code may change once we permit
-        # for customized backgrounds, but this should do for the
-        # moment.
-        if (_static_image and IDLE_STATUS_ENABLED):
-            draw.rectangle(
-                [(0, 0), (_frame_size[0], _frame_size[1])], 'black', 'black')
+        _clock.invalidate()
+        _split_kind = None
 
         # Check for screen press before proceeding.  A press when idle
         # generates the status screen.
@@ -2568,33 +5407,34 @@ def update_display(touched=False):
             elif response['result'][0]['type'] == 'audio':
                 summary = "Audio playing"
 
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "XBMC.GetInfoLabels",
-                "params": {"labels": STATUS_LABELS},
-                "id": "4st",
-            }
-            status_resp = requests.post(
-                rpc_url,
-                data=json.dumps(payload),
-                headers=headers).json()
+            status_resp = get_labels(screen_label_request("status"), batch_labels)
 
             # Add the summary string above to the response dictionary.
             # The try/except is in case Kodi communication gets
             # disrupted while showing the status screen!
             try:
                 status_resp['result']['summary'] = summary
+                frame_key = (("status", blank) +
+                             tuple(sorted(status_resp['result'].items())))
             except:
                 pass
 
-            status_screen(image, draw, status_resp['result'])
+            if (not skipping or frame_key is None or
+                frame_key != _last_frame_key):
+                status_screen(image, draw, status_resp['result'])
+            else:
+                _dirty.unchanged()
             screen_on()
         else:
+            frame_key = ("off", blank)
+            blank_frame()
             screen_off()
 
     elif (response['result'][0]['type'] == 'video' and VIDEO_ENABLED):
         # Video is playing
         _kodi_playing = True
+        if blank:
+            blank_frame()
 
         # Change display modes upon any screen press, forcing a
         # re-fetch of any artwork.  Clear other state that may also be
@@ -2607,20 +5447,11 @@ def update_display(touched=False):
                 _last_image_time = None
                 _last_thumb = None
                 _static_image = None
-                truncate_line.cache_clear()
-                text_wrap.cache_clear()
 
         # Retrieve video InfoLabels in a single JSON-RPC call
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "XBMC.GetInfoLabels",
-            "params": {"labels": VIDEO_LABELS},
-            "id": "4v",
-        }
-        response = requests.post(
-            rpc_url,
-            data=json.dumps(payload),
-            headers=headers).json()
+        response = get_split_labels("video", batch_labels, force=pressed)
+        if use_clock:
+            _clock.sync(players, response.get('result'), clock_props)
         # print("Response: ", json.dumps(response))
         try:
             video_info = response['result']
@@ -2642,6 +5473,9 @@ def update_display(touched=False):
     elif (response['result'][0]['type'] == 'audio' and AUDIO_ENABLED):
         # Audio is playing!
         _kodi_playing = True
+        _kodi_playerid = response['result'][0].get('playerid', 0)
+        if blank:
+            blank_frame()
 
         # Change display modes upon any screen press, forcing a
         # re-fetch of any artwork.  Clear other state that may also be
@@ -2654,20 +5488,11 @@ def update_display(touched=False):
                 _last_image_time = None
                 _last_thumb = None
                 _static_image = None
-                truncate_line.cache_clear()
-                text_wrap.cache_clear()
 
         # Retrieve all music InfoLabels in a single JSON-RPC call.
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "XBMC.GetInfoLabels",
-            "params": {"labels": AUDIO_LABELS},
-            "id": "4a",
-        }
-        response = requests.post(
-            rpc_url,
-            data=json.dumps(payload),
-            headers=headers).json()
+        response = get_split_labels("audio", batch_labels, force=pressed)
+        if use_clock:
+            _clock.sync(players, response.get('result'), clock_props)
         # print("Response: ", json.dumps(response))
         try:
             track_info = response['result']
@@ -2694,6 +5519,8 @@ def update_display(touched=False):
     elif (response['result'][0]['type'] == 'picture' and SLIDESHOW_ENABLED):
         # Photo slideshow is in-progress!
         _kodi_playing = True
+        _clock.invalidate()
+        _split_kind = None
 
         # Change display modes upon any screen press, forcing a
         # re-fetch of any artwork.  Clear other state that may also be
@@ -2706,19 +5533,8 @@ def update_display(touched=False):
                 _last_image_time = None
                 _last_thumb = None
                 _static_image = None
-                truncate_line.cache_clear()
-                text_wrap.cache_clear()
-
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "XBMC.GetInfoLabels",
-            "params": {"labels": SLIDESHOW_LABELS},
-            "id": "4s",
-        }
-        response = requests.post(
-            rpc_url,
-            data=json.dumps(payload),
-            headers=headers).json()
+
+        response = get_labels(screen_label_request("slide"), batch_labels)
         # print("Response: ", json.dumps(response))
         try:
             slide_info = response['result']
@@ -2728,8 +5544,17 @@ def update_display(touched=False):
         except BaseException:
             raise
 
-    # Output to OLED/LCD display or framebuffer
-    device.display(image)
+    # Output to OLED/LCD display or framebuffer, unless it already
+    # shows this frame
+    _dirty.end_frame()
+    if (skipping and
+        ((frame_key is not None and frame_key == _last_frame_key) or
+         frame_damage() == [])):
+        _frame_counts["skipped"] += 1
+    else:
+        _frame_counts["sent"] += 1
+        device.display(image)
+    _last_frame_key = frame_key
     _lock.release()
 
 
@@ -2751,6 +5576,7 @@ def touch_callback(channel):
             update_display(touched=True)
         else:
             _screen_press = _kodi_connected
+            _wake_event.set()
     return
 
 
@@ -2761,6 +5587,7 @@ def touch_callback(channel):
 #
 def main(device_handle):
     global device
+    global _last_frame_key
     global _kodi_connected, _kodi_playing
     global _screen_press
     _kodi_connected = False
@@ -2784,6 +5611,11 @@ def main(device_handle):
         GPIO.add_event_detect(TOUCH_INT, edge=GPIO.FALLING,
                               callback=touch_callback, bouncetime=TOUCH_DEBOUNCE)
 
+    if DEBUG_RPC:
+        report_label_requests()
+
+    art_cache_init()
+
     # main communication loop
     while True:
         screen_on()
@@ -2791,28 +5623,23 @@ def main(device_handle):
             [(0, 0), (_frame_size[0], _frame_size[1])], 'black', 'black')
         draw.text((5, 5), "Waiting to connect with Kodi...",
                   fill='white', font=_fonts["font_main"])
+        _dirty.invalidate()
+        _last_frame_key = None
         device.display(image)
 
         while True:
             # ensure Kodi is up and accessible
-            payload = {
-                "jsonrpc": "2.0",
-                "method": "JSONRPC.Ping",
-                "id": 2,
-            }
-
             try:
                 print(datetime.now(), "Trying ping...")
-                response = requests.post(
-                    rpc_url, data=json.dumps(payload), headers=headers,
-                    timeout=5).json()
+                response = kodi_rpc(_PAYLOAD_PING, "JSONRPC.Ping", timeout=5)
                 if response['result'] != 'pong':
                     print(datetime.now(), "Kodi not available via HTTP-transported JSON-RPC.  Waiting...")
                     time.sleep(2)
                 else:
                     break
             except (ConnectionRefusedError,
-                    requests.exceptions.ConnectionError):
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
                 if _lock.locked():
                     _lock.release()
                 time.sleep(5)
@@ -2827,22 +5654,38 @@ def main(device_handle):
         print(datetime.now(), "Connected with Kodi.  Entering update_display() loop.")
         screen_off()
 
+        if USE_TCP_EVENTS:
+            maintain_event_socket(immediately=True)
+
         # Loop until Kodi goes away
         _kodi_connected = True
         _screen_press = False
+        stats_time = time.time()
         while True:
             start_time = time.time()
+            _wake_event.clear()
             if DEMO_MODE:
                 keys = device._pygame.key.get_pressed()
                 if keys[device._pygame.K_SPACE]:
                     _screen_press = True
                     print(datetime.now(), "Touchscreen pressed (emulated)")
 
+            if USE_TCP_EVENTS:
+                maintain_event_socket()
+
             try:
                 update_display()
-            except (ConnectionRefusedError,
-                    requests.exceptions.ConnectionError):
+
+                # Spend time left over in this second building the
+                # static images for other layouts
+                if (PRERENDER_LAYOUTS and time.time() - start_time < 0.5):
+                    prerender_layout()
+            except (ConnectionError,
+                    TimeoutError,
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
                 print(datetime.now(), "Communication disrupted!")
+                close_event_socket()
                 _kodi_connected = False
                 _kodi_playing = False
                 _screen_press = False
@@ -2866,8 +5709,31 @@ def main(device_handle):
             # duration, we might as well measure how long the update
             # takes and then sleep whatever remains of that second.
 
+            if start_time - stats_time >= 60:
+                if DEBUG_RPC:
+                    print(datetime.now(), "JSON-RPC latency summary:")
+                    rpc_stats_summary()
+                if DEBUG_ART:
+                    artwork_cache_summary()
+                if DEBUG_FRAMES:
+                    frame_stats_summary()
+                    static_cache_summary()
+                    text_sprite_summary()
+                stats_time = start_time
+
+            #
+            # With Kodi notifications available, an idle panel with
+            # nothing on-screen just waits for Kodi (or a screen
+            # press) to wake it.  Otherwise, a notification merely
+            # cuts the remainder of the second short.
+
             elapsed = time.time() - start_time
-            if elapsed < 0.985:
+            if (_event_socket and _event_socket.connected and not DEMO_MODE):
+                if not (_kodi_playing or _screen_active or IDLE_STATUS_ENABLED):
+                    _wake_event.wait(TCP_IDLE_TIMEOUT)
+                else:
+                    _wake_event.wait(max(0.985 - elapsed, 0.010))
+            elif elapsed < 0.985:
                 time.sleep(0.985 - elapsed)
             else:
                 time.sleep(1.0)
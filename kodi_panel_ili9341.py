@@ -15,6 +15,7 @@ from luma.lcd.device import ili9341
 # kodi_panel modules
 import config
 import kodi_panel_display
+import kodi_panel_partial
 
 # Issue new gamma values to the ILI9341 controller below?
 CHANGE_GAMMA = True
@@ -70,16 +71,23 @@ CHANGE_GAMMA = True
 serial = spi(port=0, device=0, gpio_DC=24, gpio_RST=25,
              reset_hold_time=0.2, reset_release_time=0.2)
 
+# Send only the changed portions of the screen (see kodi_panel_partial)
+framebuffer = None
+if kodi_panel_partial.PARTIAL_UPDATES:
+    framebuffer = kodi_panel_partial.damage_framebuffer()
+
 if kodi_panel_display.USE_PWM:
     device = ili9341(serial, active_low=False, width=320, height=240,
                      bus_speed_hz=32000000,
                      gpio_LIGHT=18,
-                     pwm_frequency=PWM_FREQ
+                     pwm_frequency=PWM_FREQ,
+                     framebuffer=framebuffer
     )
 else:
     device = ili9341(serial, active_low=False, width=320, height=240,
                      bus_speed_hz=32000000,
-                     gpio_LIGHT=18
+                     gpio_LIGHT=18,
+                     framebuffer=framebuffer
     )
 
 
@@ -15,6 +15,7 @@ from luma.lcd.device import ili9486
 # kodi_panel modules
 import config
 import kodi_panel_display
+import kodi_panel_partial
 
 # ----------------------------------------------------------------------------
 
@@ -52,8 +53,14 @@ import kodi_panel_display
 serial = spi(port=0, device=0, gpio_DC=24, gpio_RST=25,
              reset_hold_time=0.2, reset_release_time=0.2)
 
+# Send only the changed portions of the screen (see kodi_panel_partial)
+framebuffer = None
+if kodi_panel_partial.PARTIAL_UPDATES:
+    framebuffer = kodi_panel_partial.damage_framebuffer(rotate=1)
+
 device = ili9486(serial, active_low=False, width=320, height=480,
-                 rotate=1, bus_speed_hz=50000000)
+                 rotate=1, bus_speed_hz=50000000,
+                 framebuffer=framebuffer)
 
 if __name__ == "__main__":
     try:
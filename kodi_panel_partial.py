@@ -0,0 +1,200 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# Partial screen updates for SPI-attached panels driven via luma.lcd
+#
+# luma.lcd's ili9341 and ili9486 classes hand each frame to a
+# "framebuffer" object, which decides which windows of the panel need
+# to be sent.  For each window, the device issues a column address
+# set (0x2A), a page address set (0x2B), and a memory write (0x2C) of
+# just that region's pixels.  luma.core's default, diff_to_previous,
+# finds those windows by comparing the entire frame against the
+# previous one.
+#
+# kodi_panel already knows what it changed (see Dirty-Region
+# Rendering in kodi_panel_display), so damage_framebuffer sends just
+# those rectangles without any comparison.  Whenever the whole frame
+# may have changed, it falls back to diff_to_previous.  It is used by
+# passing an instance to the device constructor, e.g.
+#
+#   device = ili9341(serial, ..., framebuffer=damage_framebuffer())
+#
+# The rotate argument must match the one given to the device.
+#
+# MockSPI stands in for luma.core's spi serial interface, recording
+# the bytes that would have crossed the bus.  It also keeps a copy of
+# the panel's memory so that the result of partial updates can be
+# checked without any hardware:
+#
+#   serial = kodi_panel_partial.MockSPI(320, 240)
+#   device = ili9341(serial, gpio=noop(), ...)
+#
+# ----------------------------------------------------------------------------
+
+from PIL import Image
+from luma.core.framebuffer import diff_to_previous
+
+# kodi_panel modules
+import config
+import kodi_panel_display
+
+# Use damage_framebuffer in the SPI launchers?
+PARTIAL_UPDATES = config.settings.get("PARTIAL_UPDATES", True)
+
+
+# ----------------------------------------------------------------------------
+
+# Convert a rectangle in kodi_panel's frame into the panel's own
+# coordinates, given luma's rotate setting and the panel (physical)
+# width and height
+def rotate_rect(rect, rotate, width, height):
+    x0, y0, x1, y1 = rect
+    if rotate == 1:
+        return (width - y1, x0, width - y0, x1)
+    elif rotate == 2:
+        return (width - x1, height - y1, width - x0, height - y0)
+    elif rotate == 3:
+        return (y0, height - x1, y1, height - x0)
+    return rect
+
+
+def _overlapping(a, b):
+    return (a[0] <= b[2] and b[0] <= a[2] and
+            a[1] <= b[3] and b[1] <= a[3])
+
+
+# Combine overlapping or abutting rectangles, so that no part of the
+# panel gets written twice
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        while True:
+            for other in merged:
+                if _overlapping(rect, other):
+                    merged.remove(other)
+                    rect = kodi_panel_display.union_box(rect, other)
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+
+class damage_framebuffer(object):
+    """
+    luma.core framebuffer that sends only the rectangles reported by
+    kodi_panel_display.frame_damage().
+
+    :param rotate: The rotate value given to the device.
+    :param max_fraction: If the merged rectangles cover more than this
+        fraction of the screen, a single window surrounding all of
+        them is sent instead.
+    :param num_segments: Passed along to diff_to_previous, for frames
+        without damage information.
+    """
+
+    def __init__(self, rotate=0, max_fraction=0.5, num_segments=4):
+        self.rotate = rotate
+        self.max_fraction = max_fraction
+        self.diff = diff_to_previous(num_segments=num_segments)
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.pixels_sent = 0
+
+    def redraw(self, image):
+        damage = kodi_panel_display.frame_damage()
+        prev_image = self.diff.prev_image
+        if (damage is None or prev_image is None or
+                prev_image.size != image.size):
+            self.full_frames += 1
+            for part, bounding_box in self.diff.redraw(image):
+                self.pixels_sent += part.width * part.height
+                yield part, bounding_box
+            return
+
+        self.partial_frames += 1
+        rects = [rotate_rect(rect, self.rotate, image.width, image.height)
+                 for rect in merge_rects(damage)]
+        area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+        if (len(rects) > 1 and
+                area > self.max_fraction * image.width * image.height):
+            bounding_box = None
+            for rect in rects:
+                bounding_box = kodi_panel_display.union_box(bounding_box, rect)
+            rects = [bounding_box]
+
+        for rect in rects:
+            part = image.crop(rect)
+            # keep diff_to_previous's copy current
+            prev_image.paste(part, rect[:2])
+            self.pixels_sent += part.width * part.height
+            yield part, rect
+
+    def summary(self):
+        return ("%d full frames, %d partial frames, %d pixels sent" %
+                (self.full_frames, self.partial_frames, self.pixels_sent))
+
+
+# ----------------------------------------------------------------------------
+
+# Start and end addresses from the arguments to a column (0x2A) or
+# page (0x2B) address set.  luma.lcd's ili9486 pads each byte to 16
+# bits for Waveshare's shift registers, sending 8 bytes rather than 4.
+def _address_range(args):
+    if len(args) == 8:
+        args = args[1::2]
+    return ((args[0] << 8) | args[1], (args[2] << 8) | args[3])
+
+
+class MockSPI(object):
+    """
+    Serial interface that records, rather than transmits, commands and
+    data.  Pixel data written after a memory write command is applied
+    to an RGB image of the panel's memory, assuming 3 bytes per pixel
+    as sent by luma.lcd's ili9341 and ili9486.
+
+    :param width: Panel width, before any rotation.
+    :param height: Panel height, before any rotation.
+    """
+
+    def __init__(self, width, height):
+        self.panel = Image.new("RGB", (width, height))
+        self.command_bytes = 0
+        self.data_bytes = 0
+        self.windows = []
+        self._cmd = None
+        self._columns = (0, width - 1)
+        self._pages = (0, height - 1)
+
+    def command(self, *cmd):
+        self.command_bytes += len(cmd)
+        self._cmd = cmd[0]
+        args = cmd[1:]
+        if (self._cmd == 0x2A and len(args) in (4, 8)):
+            self._columns = _address_range(args)
+        elif (self._cmd == 0x2B and len(args) in (4, 8)):
+            self._pages = _address_range(args)
+
+    def data(self, data):
+        self.data_bytes += len(data)
+        if self._cmd == 0x2A:
+            self._columns = _address_range(data)
+        elif self._cmd == 0x2B:
+            self._pages = _address_range(data)
+        elif self._cmd == 0x2C:
+            box = (self._columns[0], self._pages[0],
+                   self._columns[1] + 1, self._pages[1] + 1)
+            size = (box[2] - box[0], box[3] - box[1])
+            if len(data) == 3 * size[0] * size[1]:
+                self.panel.paste(Image.frombytes("RGB", size, bytes(data)), box[:2])
+            self.windows.append(box)
+
+    def cleanup(self):
+        pass
+
+    # Milliseconds the recorded traffic would occupy the bus
+    def bus_ms(self, bus_speed_hz):
+        return (self.command_bytes + self.data_bytes) * 8 * 1000 / bus_speed_hz
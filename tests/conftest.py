@@ -0,0 +1,21 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# kodi_panel_display reads setup.toml (and the fonts and images it
+# names) relative to the working directory, so the tests run from the
+# top of the tree with the 800x480 example setup.
+#
+# ----------------------------------------------------------------------------
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.chdir(ROOT)
+os.environ.setdefault("KODI_PANEL_SETUP",
+                      os.path.join(ROOT, "example_setups", "example_setup_800x480.toml"))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,89 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# ArtworkCache's collapsing of identical concurrent retrievals.
+#
+# ----------------------------------------------------------------------------
+
+import threading
+import time
+
+from PIL import Image
+
+from kodi_panel_display import ArtworkCache
+
+
+class SlowFetch:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return Image.new("RGB", (100, 100))
+
+
+# As get_artwork() does
+def lookup(cache, key, fetch):
+    found, image = cache.get(key)
+    if not found:
+        image = cache.fetch_once(key, fetch)
+    return image
+
+
+def test_concurrent_requests_fetch_once():
+    cache = ArtworkCache(1024 * 1024)
+    fetch = SlowFetch()
+    start = threading.Barrier(8)
+    results = []
+
+    def request():
+        start.wait()
+        results.append(lookup(cache, "cover", fetch))
+
+    threads = [threading.Thread(target=request) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetch.calls == 1
+    assert len(results) == 8
+    assert all(image is results[0] for image in results)
+
+
+def test_request_missing_just_before_completion():
+    cache = ArtworkCache(1024 * 1024)
+    fetch = SlowFetch(delay=0)
+
+    # This caller misses, then another finishes the retrieval
+    # before it gets to fetch_once()
+    assert cache.get("cover") == (False, None)
+    leader = threading.Thread(target=cache.fetch_once, args=("cover", fetch))
+    leader.start()
+    leader.join()
+
+    assert cache.fetch_once("cover", fetch) is not None
+    assert fetch.calls == 1
+
+
+def test_failed_fetch_is_retried():
+    cache = ArtworkCache(1024 * 1024)
+
+    def broken():
+        raise ConnectionError("no artwork")
+
+    try:
+        cache.fetch_once("cover", broken)
+    except ConnectionError:
+        pass
+    fetch = SlowFetch(delay=0)
+    assert cache.fetch_once("cover", fetch) is not None
+    assert fetch.calls == 1
+    assert not cache.inflight
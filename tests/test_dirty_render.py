@@ -0,0 +1,67 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# DamageTracker's handling of user-installed element callbacks.
+#
+# ----------------------------------------------------------------------------
+
+from PIL import Image, ImageDraw
+
+import kodi_panel_display
+from kodi_panel_display import DamageTracker, ScreenMode
+
+
+# Draws a box whose colour follows a counter, examining no InfoLabels
+# that kodi_panel knows of
+def element_counter(image, draw, info, field, screen_mode, layout_name):
+    draw.rectangle((field["posx"], field["posy"],
+                    field["posx"] + 20, field["posy"] + 20),
+                   fill=(info["counter"] % 256, 0, 0))
+    return ""
+
+
+def render_frames(monkeypatch, labels=None, bounds=None):
+    monkeypatch.setitem(kodi_panel_display.ELEMENT_CB, "counter", element_counter)
+    if labels is not None:
+        monkeypatch.setitem(kodi_panel_display.CALLBACK_LABELS, element_counter, labels)
+    if bounds is not None:
+        monkeypatch.setitem(kodi_panel_display.CALLBACK_BOUNDS, element_counter, bounds)
+
+    layout = {"fields": [{"name": "counter", "posx": 10, "posy": 10, "dynamic": 1}]}
+    static = Image.new("RGB", kodi_panel_display._frame_size, "blue")
+    image = Image.new("RGB", kodi_panel_display._frame_size)
+    draw = ImageDraw.Draw(image)
+
+    tracker = DamageTracker()
+    damage = []
+    copies = []
+    monkeypatch.setattr(Image.Image, "copy",
+                        lambda self, orig=Image.Image.copy: copies.append(self) or orig(self))
+    for counter in range(3):
+        tracker.render(image, draw, static, layout, {"counter": counter},
+                       ScreenMode.STATUS, "STATUS_LAYOUT", -1)
+        damage.append(tracker.damage)
+    assert image.getpixel((15, 15)) == (2, 0, 0)
+    return damage, copies
+
+
+def test_untrackable_callback_redraws_in_full(monkeypatch):
+    damage, copies = render_frames(monkeypatch)
+    assert damage == [None, None, None]
+    assert not copies
+
+
+def test_callback_with_bounds_is_tracked(monkeypatch):
+    damage, copies = render_frames(
+        monkeypatch,
+        bounds=lambda image, draw, info, field, mode, name: (10, 10, 31, 31))
+    assert damage[1] == [(9, 9, 32, 32)]
+    assert not copies
+
+
+def test_callback_with_labels_is_tracked(monkeypatch):
+    damage, copies = render_frames(monkeypatch, labels=["counter"])
+    assert damage[1] == [(9, 9, 32, 32)]
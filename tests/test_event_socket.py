@@ -0,0 +1,173 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# KodiEventSocket against a small stand-in for Kodi's TCP JSON-RPC
+# server, which answers requests and pushes notifications on demand.
+#
+# ----------------------------------------------------------------------------
+
+import json
+import queue
+import socket
+import threading
+import time
+
+import pytest
+
+import kodi_panel_display
+
+
+class StandInKodi:
+    def __init__(self):
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.connections = queue.Queue()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self.server.accept()
+            except OSError:
+                return
+            self.connections.put(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    # Answer each request, as Kodi does, with no delimiter in between
+    def _serve(self, conn):
+        decoder = json.JSONDecoder()
+        buffer = ""
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data.decode("utf-8")
+            while buffer:
+                buffer = buffer.lstrip()
+                try:
+                    msg, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                buffer = buffer[end:]
+                result = "pong" if msg["method"] == "JSONRPC.Ping" else {}
+                self.send(conn, {"jsonrpc": "2.0", "id": msg["id"], "result": result})
+
+    def send(self, conn, msg):
+        try:
+            conn.sendall(json.dumps(msg).encode("utf-8"))
+        except OSError:
+            pass
+
+    def notify(self, conn, method):
+        self.send(conn, {"jsonrpc": "2.0", "method": method,
+                         "params": {"data": {}, "sender": "xbmc"}})
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def kodi(monkeypatch):
+    stand_in = StandInKodi()
+    monkeypatch.setattr(kodi_panel_display, "_tcp_host", "127.0.0.1")
+    monkeypatch.setattr(kodi_panel_display, "TCP_PORT", stand_in.port)
+    yield stand_in
+    kodi_panel_display.close_event_socket()
+    stand_in.close()
+
+
+# A playback clock synced moments ago, so not yet due for a query
+def synced_clock():
+    clock = kodi_panel_display._clock
+    clock.invalidate()
+    clock.players = {"result": [{"playerid": 0, "type": "audio"}]}
+    clock.synced_at = time.monotonic()
+    assert not clock.expired()
+    return clock
+
+
+def test_requests_travel_over_socket(kodi):
+    kodi_panel_display.open_event_socket()
+    kodi.connections.get(timeout=5)
+
+    response = kodi_panel_display.kodi_rpc(kodi_panel_display._PAYLOAD_PING,
+                                           "JSONRPC.Ping")
+    assert response["result"] == "pong"
+
+
+@pytest.mark.parametrize("method", ["Player.OnPlay", "Player.OnPause", "Player.OnStop"])
+def test_notification_wakes_and_invalidates_clock(kodi, method):
+    kodi_panel_display.open_event_socket()
+    conn = kodi.connections.get(timeout=5)
+
+    clock = synced_clock()
+    wake = kodi_panel_display._wake_event
+    wake.clear()
+    kodi.notify(conn, method)
+
+    assert wake.wait(5)
+    assert kodi_panel_display._event_socket.last_event == method
+    assert clock.expired()
+
+
+def test_other_notifications_ignored(kodi):
+    kodi_panel_display.open_event_socket()
+    conn = kodi.connections.get(timeout=5)
+
+    clock = synced_clock()
+    wake = kodi_panel_display._wake_event
+    wake.clear()
+    kodi.notify(conn, "Application.OnVolumeChanged")
+    kodi.notify(conn, "Player.OnPause")   # arrives right behind it
+
+    assert wake.wait(5)
+    assert kodi_panel_display._event_socket.last_event == "Player.OnPause"
+    assert clock.expired()
+
+
+def test_reconnect_after_drop(kodi):
+    kodi_panel_display.maintain_event_socket(immediately=True)
+    conn = kodi.connections.get(timeout=5)
+    kodi_panel_display.maintain_event_socket()   # an update goes by
+
+    # Kodi drops the connection, while HTTP would carry on
+    wake = kodi_panel_display._wake_event
+    wake.clear()
+    conn.shutdown(socket.SHUT_RDWR)
+    conn.close()
+    assert wake.wait(5)
+    assert not kodi_panel_display._event_socket.connected
+
+    # main() reopens it right away, before the next update
+    kodi_panel_display.maintain_event_socket()
+    kodi.connections.get(timeout=5)
+    assert kodi_panel_display._event_socket.connected
+    response = kodi_panel_display._event_socket.call(kodi_panel_display._PAYLOAD_PING)
+    assert response["result"] == "pong"
+
+
+def test_reconnect_backs_off(kodi):
+    kodi_panel_display.maintain_event_socket(immediately=True)
+    conn = kodi.connections.get(timeout=5)
+
+    # With Kodi's TCP server gone, a failed attempt defers the next one
+    kodi.close()
+    wake = kodi_panel_display._wake_event
+    wake.clear()
+    conn.shutdown(socket.SHUT_RDWR)
+    conn.close()
+    assert wake.wait(5)
+
+    kodi_panel_display.maintain_event_socket()
+    assert kodi_panel_display._event_socket is None
+    retry_time = kodi_panel_display._tcp_retry_time
+    assert retry_time > time.time()
+
+    kodi_panel_display.maintain_event_socket()
+    assert kodi_panel_display._tcp_retry_time == retry_time
@@ -0,0 +1,91 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# damage_framebuffer driving luma.lcd's ili9341 and ili9486 into
+# MockSPI, checking the panel's memory against each frame and the
+# number of bytes that crossed the bus.
+#
+# ----------------------------------------------------------------------------
+
+import pytest
+from PIL import Image, ImageDraw
+from luma.core.interface.serial import noop
+from luma.lcd.device import ili9341, ili9486
+
+import kodi_panel_display
+import kodi_panel_partial
+
+
+def make_ili9341(framebuffer):
+    serial = kodi_panel_partial.MockSPI(320, 240)
+    return serial, ili9341(serial, gpio=noop(), width=320, height=240,
+                           rotate=0, framebuffer=framebuffer)
+
+def make_ili9486(framebuffer):
+    serial = kodi_panel_partial.MockSPI(320, 480)
+    return serial, ili9486(serial, gpio=noop(), width=320, height=480,
+                           rotate=1, framebuffer=framebuffer)
+
+
+@pytest.fixture(params=[(make_ili9341, 0), (make_ili9486, 1)],
+                ids=["ili9341", "ili9486"])
+def panel(request, monkeypatch):
+    make, rotate = request.param
+    damage = [None]    # the device clears the panel upon creation
+    monkeypatch.setattr(kodi_panel_display, "frame_damage", lambda: damage[-1])
+    serial, device = make(kodi_panel_partial.damage_framebuffer(rotate=rotate))
+
+    # Show a frame, with the given damage, returning the data bytes sent
+    def show(image, frame_damage):
+        damage.append(frame_damage)
+        sent = serial.data_bytes
+        device.display(image)
+        assert serial.panel.tobytes() == device.preprocess(image).tobytes()
+        return serial.data_bytes - sent
+
+    return device, show
+
+
+def test_damaged_and_undamaged_frames(panel):
+    device, show = panel
+    width, height = device.size
+    full_frame = 3 * width * height
+
+    image = Image.new("RGB", device.size)
+    draw = ImageDraw.Draw(image)
+    for x in range(0, width, 20):
+        draw.line((x, 0, width - x, height - 1), fill=(x % 256, 80, 200))
+    assert show(image, None) > 0
+
+    # A single changed rectangle
+    draw.rectangle((30, 40, 129, 79), fill="red")
+    sent = show(image, [(30, 40, 130, 80)])
+    assert 0 < sent < full_frame
+    assert sent >= 3 * 100 * 40
+
+    # Nothing changed at all
+    assert show(image, []) == 0
+
+    # Two apart, plus two that overlap and must be merged
+    draw.rectangle((0, 0, 9, 9), fill="yellow")
+    draw.rectangle((width - 20, height - 20, width - 1, height - 1), fill="blue")
+    draw.text((50, 50), "12:34", fill="white")
+    draw.text((70, 55), "PM", fill="green")
+    sent = show(image, [(0, 0, 10, 10), (width - 20, height - 20, width, height),
+                        (49, 49, 90, 65), (69, 54, 95, 70)])
+    assert 0 < sent < full_frame
+
+
+def test_without_damage_information(panel):
+    device, show = panel
+    width, height = device.size
+
+    image = Image.new("RGB", device.size, "white")
+    show(image, None)
+
+    # diff_to_previous finds the change on its own
+    ImageDraw.Draw(image).rectangle((10, 10, 59, 29), fill="black")
+    assert 0 < show(image, None) < 3 * width * height
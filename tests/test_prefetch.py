@@ -0,0 +1,77 @@
+#
+# MIT License -- see LICENSE.rst for details
+# Copyright (c) 2020-21 Matthew Lovell and contributors
+#
+# ----------------------------------------------------------------------------
+#
+# TrackPrefetcher, with Kodi's replies to its lookups stubbed out.
+#
+# ----------------------------------------------------------------------------
+
+import json
+import pytest
+from PIL import Image
+
+import kodi_panel_display
+from kodi_panel_display import TrackPrefetcher, cover_identity
+
+
+NEXT_ITEM = {
+    "label": "So What", "title": "So What", "album": "Kind of Blue",
+    "artist": ["Miles Davis"], "genre": ["Jazz"], "year": 1959,
+    "track": 1, "duration": 562, "displaycomposer": "Miles Davis",
+    "file": "/storage/music/Kind of Blue/01 So What.flac",
+    "thumbnail": "image://%2fstorage%2fmusic%2fKind%20of%20Blue%2fcover.jpg/",
+}
+
+
+@pytest.fixture
+def kodi(monkeypatch):
+    requests = []
+
+    def kodi_rpc(payload, method=None, timeout=None):
+        request = json.loads(payload)
+        requests.append(request)
+        if request["method"] == "Player.GetProperties":
+            return {"result": {"playlistid": 0, "position": 4}}
+        return {"result": {"items": [NEXT_ITEM]}}
+
+    monkeypatch.setattr(kodi_panel_display, "kodi_rpc", kodi_rpc)
+    monkeypatch.setattr(kodi_panel_display, "get_artwork",
+                        lambda *args, **kwargs: Image.new("RGB", (10, 10)))
+    monkeypatch.setattr(kodi_panel_display, "load_artwork",
+                        lambda *args, **kwargs: Image.new("RGB", (10, 10)))
+    return requests
+
+
+def test_cover_identity():
+    plain = "/storage/music/Kind of Blue/cover.jpg"
+    assert cover_identity(NEXT_ITEM["thumbnail"]) == plain
+    assert cover_identity(plain) == plain
+    assert cover_identity("DefaultAlbumCover.png") == cover_identity("")
+
+
+def test_prefetched_frame_survives_cover_form(kodi):
+    layout_name = next(iter(kodi_panel_display.AUDIO_LAYOUT))
+    layout = kodi_panel_display.AUDIO_LAYOUT[layout_name]
+    current = {label: "" for label in
+               kodi_panel_display.static_label_request(layout_name)}
+    current["MusicPlayer.Title"] = "Freddie Freeloader"
+
+    prefetch = TrackPrefetcher()
+    prefetch.current = "key"
+    prefetch._fetch("key", current, 1)
+
+    # Looked up via the audio player's own id
+    assert kodi[0]["params"]["playerid"] == 1
+
+    prefetch.render(layout, layout_name)
+    assert prefetch.frames[layout_name] is not None
+
+    # Kodi reports the cover unwrapped once the track starts
+    actual = dict(prefetch.info)
+    actual["MusicPlayer.Cover"] = "/storage/music/Kind of Blue/cover.jpg"
+    assert prefetch.take(layout_name, actual) is not None
+
+    actual["MusicPlayer.Cover"] = "/storage/music/Milestones/cover.jpg"
+    assert prefetch.take(layout_name, actual) is None